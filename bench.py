@@ -0,0 +1,61 @@
+# MicroPython
+# mail: goctaprog@gmail.com
+# MIT license
+# Измерение затрат драйвера MCP23017 на MCU.
+# Measuring the MCP23017 driver costs on the MCU.
+import gc
+import time
+_import_start = time.ticks_us()
+import mcp23017mod      # импортирует и sensor_pack.base_sensor
+_import_us = time.ticks_diff(time.ticks_us(), _import_start)
+from machine import I2C, Pin
+from sensor_pack.bus_service import I2cAdapter
+
+
+def bench_iterator(expander: mcp23017mod.MCP23017, count: int = 1000) -> tuple:
+    """Возвращает кол-во байт, выделенных в куче за count итераций for v in expander, и время одной итерации в мкс.
+    Returns the number of heap bytes allocated during count iterations and the time of one iteration in us."""
+    for _ in expander:      # прогрев
+        break
+    cnt = 0
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    start = time.ticks_us()
+    for _ in expander:
+        cnt += 1
+        if cnt >= count:
+            break
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    after = gc.mem_alloc()
+    gc.enable()
+    return after - before, elapsed / count
+
+
+def bench_boot(adapter: I2cAdapter, address: int = 0x27, count: int = 10, **kwargs) -> float:
+    """Возвращает время создания (инициализации) экземпляра MCP23017 в мкс. kwargs передаются в конструктор.
+    Returns the MCP23017 constructor time in us. kwargs are passed to the constructor."""
+    start = time.ticks_us()
+    for _ in range(count):
+        mcp23017mod.MCP23017(adapter, address, **kwargs)
+    return time.ticks_diff(time.ticks_us(), start) / count
+
+
+if __name__ == '__main__':
+    # пожалуйста установите выводы scl и sda в конструкторе для вашей платы, иначе ничего не заработает!
+    # please set scl and sda pins for your board, otherwise nothing will work!
+    i2c = I2C(id=1, scl=Pin(7), sda=Pin(6), freq=400_000)  # create I2C peripheral at frequency of 400kHz
+    adapter = I2cAdapter(i2c)       # адаптер для стандартного доступа к шине
+    print(f"import mcp23017mod: {_import_us} us")
+    # каждый вариант оставляет микросхему в режиме 8 бит (IOCON.BANK = 1)
+    for name, kwargs in (("probe", {}), ("bank=True", {"bank": True})):
+        print(f"boot, {name}: {bench_boot(adapter, **kwargs)} us")
+    expander = mcp23017mod.MCP23017(adapter, bank=True)
+    # образ регистров, сохраненный ранее (например, в файле), заполняет теневую копию без обмена по шине
+    image = expander.snapshot()
+    print(f"boot, image: {bench_boot(adapter, image=image)} us")
+
+    for hex_mode in (False, True):
+        expander.hex_mode = hex_mode
+        allocated, period = bench_iterator(expander)
+        print(f"hex mode: {hex_mode}; allocated: {allocated} bytes; iteration: {period} us")
@@ -0,0 +1,165 @@
+# micropython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Счетчики импульсов и квадратурные энкодеры на входах MCP23017 (по событиям прерывания INTF/INTCAP).
+Pulse counters and quadrature encoders on MCP23017 inputs, decoded from INTF/INTCAP interrupt events."""
+import array
+import time
+from mcp23017mod import MCP23017
+from sensor_pack.base_sensor import check_value
+
+RISING = 1
+FALLING = 2
+
+# приращение положения энкодера по индексу (старое_состояние << 2) | новое_состояние, состояние - (A << 1) | B.
+# 2 - недопустимый переход (изменились оба входа, пропущен шаг)
+_QUAD = array.array("b", (0, 1, -1, 2, -1, 0, 2, 1, 1, 2, 0, -1, 2, -1, 1, 0))
+
+
+class PulseCounter:
+    """Счетчики импульсов (например, расходомеров) и квадратурные энкодеры на входах расширителя портов.
+    Входы настраиваются на прерывание при изменении, состояние обновляется из событий прерывания
+    (expander.service_interrupt, attach_irq): уровни входов порта берутся из INTCAP, изменившиеся входы - разность
+    с предыдущими уровнями. Обработка события - несколько целочисленных операций на изменившийся вход, без
+    выделения памяти в куче, поэтому она выполняется прямо в обработчике прерывания. Положение энкодера
+    вычисляется по таблице переходов. Время каждого фронта (time.ticks_us) сохраняется для вычисления частоты.
+
+    Событие прерывания фиксирует только уровень в момент первого изменения. Если вход изменился несколько раз
+    до чтения INTCAP, то четное кол-во изменений не будет замечено, а нечетное будет учтено как одно. Поэтому
+    частота импульсов должна быть меньше частоты обслуживания прерываний, а время фронта - это время обслуживания.
+
+    Pulse counters and quadrature encoders updated from interrupt events; every event costs a few integer
+    operations per changed input."""
+    def __init__(self, expander: MCP23017, pulse_pins: int = 0, encoders: [tuple, list] = (), edges: int = RISING,
+                 pull_up: bool = False):
+        """expander - расширитель портов.
+        pulse_pins - маска входов счетчиков импульсов (бит n - вывод n, порт A - младший байт).
+        encoders - пары выводов (A, B) квадратурных энкодеров 0..15.
+        edges - считаемые фронты импульсов: RISING, FALLING или оба (RISING | FALLING).
+        pull_up - подтяжка входов к питанию (GPPU), например для механических энкодеров и контактов."""
+        check_value(edges, range(1, 4), f"Invalid edges value: {edges}")
+        self.expander = expander
+        self.edges = edges
+        self._pulse = pulse_pins & 0xFFFF
+        # номер энкодера для каждого вывода (0xFF - вывод не принадлежит энкодеру) и выводы энкодеров
+        self._enc_of = bytearray(b"\xff" * 16)
+        self._enc_pins = bytearray(2 * len(encoders))
+        used = self._pulse
+        for i, pair in enumerate(encoders):
+            for k, pin in enumerate(pair):
+                check_value(pin, range(16), f"Invalid pin value: {pin}!")
+                if (used >> pin) & 1:
+                    raise ValueError(f"Pin {pin} is already used!")
+                used |= 1 << pin
+                self._enc_of[pin] = i
+                self._enc_pins[2 * i + k] = pin
+        self.pins = used
+        # состояние счетчиков импульсов по выводам
+        self._count = array.array("l", [0 for _ in range(16)])
+        self._last_us = array.array("l", [0 for _ in range(16)])    # время последнего фронта
+        self._period_us = array.array("l", [0 for _ in range(16)])  # интервал между двумя последними фронтами
+        # состояние энкодеров
+        n = len(encoders)
+        self._state = bytearray(n)      # (A << 1) | B
+        self._position = array.array("l", [0 for _ in range(n)])
+        self._enc_last_us = array.array("l", [0 for _ in range(n)])
+        self._enc_period_us = array.array("l", [0 for _ in range(n)])   # со знаком направления
+        self.errors = 0     # кол-во недопустимых переходов энкодеров (пропущенных шагов)
+        expander._update_pins(0, used, used)        # IODIR, входы
+        expander._update_pins(1, used, 0)           # IPOL
+        if pull_up:
+            expander._update_pins(6, used, used)    # GPPU
+        expander._update_pins(4, used, 0)           # INTCON, прерывание при любом изменении
+        expander._update_pins(2, used, used)        # GPINTEN
+        self._level = expander._read_pins_reg(9)    # GPIO, чтение также сбрасывает прерывание
+        for i in range(n):
+            self._state[i] = self._enc_state(i)
+        expander.add_event_handler(self._on_event)
+
+    def deinit(self):
+        """Отключает обработку событий прерывания и выключает прерывания входов"""
+        self.expander.remove_event_handler(self._on_event)
+        self.expander._update_pins(2, self.pins, 0)     # GPINTEN
+
+    def _enc_state(self, index: int) -> int:
+        level, pins = self._level, self._enc_pins
+        return (((level >> pins[2 * index]) & 1) << 1) | ((level >> pins[2 * index + 1]) & 1)
+
+    def _on_event(self, port: int, mask: int, captured: int):
+        """Обработчик события прерывания (смотри MCP23017.add_event_handler). Может вызываться из обработчика прерывания"""
+        shift = port << 3
+        changed = (captured ^ (self._level >> shift)) & (self.pins >> shift) & 0xFF
+        if not changed:
+            return
+        now = time.ticks_us()
+        self._level ^= changed << shift
+        pin = shift
+        while changed:
+            if changed & 1:
+                if (self._pulse >> pin) & 1:
+                    if self.edges & (RISING if captured & 1 else FALLING):
+                        self._count[pin] += 1
+                        self._period_us[pin] = time.ticks_diff(now, self._last_us[pin])
+                        self._last_us[pin] = now
+                else:
+                    self._step(self._enc_of[pin], now)
+            changed >>= 1
+            captured >>= 1
+            pin += 1
+
+    def _step(self, index: int, now: int):
+        """Обновляет положение энкодера index по таблице переходов"""
+        old = self._state[index]
+        new = self._enc_state(index)
+        if new == old:  # оба входа энкодера изменились в одном событии, переход уже учтен
+            return
+        self._state[index] = new
+        delta = _QUAD[(old << 2) | new]
+        if 2 == delta:
+            self.errors += 1
+            return
+        self._position[index] += delta
+        period = time.ticks_diff(now, self._enc_last_us[index])
+        self._enc_period_us[index] = period if delta > 0 else -period
+        self._enc_last_us[index] = now
+
+    def count(self, pin: int) -> int:
+        """Возвращает кол-во импульсов на входе pin"""
+        return self._count[pin]
+
+    def position(self, index: int) -> int:
+        """Возвращает положение энкодера index (кол-во шагов, по четыре на период квадратурного сигнала)"""
+        return self._position[index]
+
+    def reset(self, pin: int = None, index: int = None):
+        """Обнуляет счетчик импульсов входа pin и/или положение энкодера index. Без параметров - все"""
+        if pin is None and index is None:
+            for i in range(16):
+                self._count[i] = 0
+            for i in range(len(self._position)):
+                self._position[i] = 0
+            return
+        if pin is not None:
+            self._count[pin] = 0
+        if index is not None:
+            self._position[index] = 0
+
+    @staticmethod
+    def _rate(period: int, last: int) -> float:
+        """Частота событий, Гц, по интервалу period между двумя последними событиями и времени последнего события.
+        Если с последнего события прошло больше period, то частота убывает (вход остановился)"""
+        if not period:
+            return 0.0
+        idle = time.ticks_diff(time.ticks_us(), last)
+        return 1E6 / max(abs(period), idle)
+
+    def frequency(self, pin: int) -> float:
+        """Возвращает частоту импульсов на входе pin, Гц (по двум последним фронтам)"""
+        return self._rate(self._period_us[pin], self._last_us[pin])
+
+    def velocity(self, index: int) -> float:
+        """Возвращает скорость энкодера index, шаг/с, со знаком направления (по двум последним шагам).
+        Обороты в минуту: 60 * velocity / (4 * кол-во периодов сигнала на оборот)"""
+        period = self._enc_period_us[index]
+        rate = self._rate(period, self._enc_last_us[index])
+        return -rate if period < 0 else rate
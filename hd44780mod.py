@@ -0,0 +1,203 @@
+# micropython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Символьный ЖКИ HD44780, подключенный к выводам MCP23017 (4-х или 8-ми битная шина данных).
+HD44780 character LCD connected to MCP23017 pins (4-bit or 8-bit data bus)."""
+import time
+from mcp23017mod import MCP23017
+from sensor_pack.base_sensor import check_value
+
+
+class HD44780:
+    """ЖКИ HD44780 на выводах MCP23017. Каждый байт ЖКИ - несколько состояний выводов (данные и строб E), которые
+    выводятся методом MCP23017.stream_output: все байты, накопленные до вызова show (или команды), передаются одной
+    транзакцией записи OLAT (IOCON.SEQOP = 1). Текст пишется в буфер кадра (write), а show передает только
+    изменившиеся знакоместа.
+
+    В режиме 8 бит (IOCON.BANK = 1) все выводы ЖКИ должны быть на одном порте, состояние - один байт.
+    В режиме 16 бит выводы могут быть на обоих портах, состояние - два байта (OLATA, OLATB).
+    Время передачи состояния должно быть не меньше 37 мкс (время выполнения команды ЖКИ) вместе с settle
+    дополнительными состояниями после каждого байта: байт I2C при 400 кГц - 22.5 мкс.
+
+    HD44780 LCD driven by streamed OLAT writes: every show() is one write transaction carrying only changed cells."""
+    def __init__(self, expander: MCP23017, rs: int, e: int, data: [tuple, list], rw: int = None,
+                 backlight: int = None, cols: int = 20, rows: int = 4, settle: int = 1):
+        """expander - расширитель портов.
+        rs, e, rw, backlight - номера выводов расширителя 0..15 (порт A - 0..7, порт B - 8..15) для сигналов RS, E,
+        R/W (если подключен, всегда 0) и управления подсветкой (1 - включена). rw и backlight могут быть None.
+        data - выводы D4..D7 (4 бита) или D0..D7 (8 бит).
+        cols, rows - кол-во знакомест в строке и строк.
+        settle - кол-во дополнительных состояний (повторений) после каждого байта ЖКИ."""
+        if len(data) not in (4, 8):
+            raise ValueError(f"Invalid data pins count: {len(data)}")
+        pins = [rs, e] + list(data) + [p for p in (rw, backlight) if p is not None]
+        for pin in pins:
+            check_value(pin, range(16), f"Invalid pin value: {pin}!")
+        self.expander = expander
+        self.cols = cols
+        self.rows = rows
+        self.settle = settle
+        self._four_bit = 4 == len(data)
+        self._rs = 1 << rs
+        self._e = 1 << e
+        self._bl = 0 if backlight is None else 1 << backlight
+        self._used = 0
+        for pin in pins:
+            self._used |= 1 << pin
+        # маски выводов для каждого значения шины данных (16 или 256 значений)
+        self._lut = [0 for _ in range(1 << len(data))]
+        for value in range(len(self._lut)):
+            for bit, pin in enumerate(data):
+                if (value >> bit) & 1:
+                    self._lut[value] |= 1 << pin
+        self._backlight = True
+        self._row_addr = 0x00, 0x40, cols, 0x40 + cols
+        self._shown = bytearray(b" " * (cols * rows))   # содержимое ЖКИ
+        self.frame = bytearray(b" " * (cols * rows))    # буфер кадра
+        self._tx = bytearray(256)   # состояния выводов для stream_output
+        self._n = 0
+        self._base = 0
+        expander._update_pins(0x0A, self._used, 0)      # OLAT
+        expander._update_pins(0, self._used, 0)         # IODIR, все выводы ЖКИ - выходы
+        self._init_lcd()
+
+    def _init_lcd(self):
+        """Инициализация ЖКИ командами (смотри документацию HD44780, Initializing by Instruction)"""
+        time.sleep_ms(50)
+        for delay_us in 4100, 100, 100:
+            self._begin()
+            if self._four_bit:
+                self._nibble(0x03)
+            else:
+                self._byte(0x30, False)
+            self._send()
+            time.sleep_us(delay_us)
+        if self._four_bit:
+            self._begin()
+            self._nibble(0x02)
+            self._send()
+        self.command(0x28 if self._four_bit else 0x38)      # function set: 2 строки, 5x8
+        self.command(0x0C)      # display on, cursor off
+        self.command(0x06)      # entry mode: увеличение адреса
+        self.clear()
+
+    def _begin(self):
+        """Начинает новую посылку. Выводы, не подключенные к ЖКИ, сохраняют значение OLAT"""
+        olat = self.expander._shadow_pins(0x0A)
+        if olat is None:
+            olat = self.expander._read_pins_reg(0x0A)
+        self._base = (olat & ~self._used) | (self._bl if self._backlight else 0)
+        self._n = 0
+
+    def _put(self, value: int):
+        """Добавляет в посылку состояние выводов value (в порядке выводов)"""
+        n, buf = self._n, self._tx
+        if n + 2 > len(buf):
+            self._tx = buf = buf + bytearray(len(buf))
+        if self.expander._bank:     # порт, к которому подключен ЖКИ
+            buf[n] = (value >> 8) if self._used > 0xFF else value & 0xFF
+            self._n = n + 1
+            return
+        buf[n] = value & 0xFF       # OLATA
+        buf[n + 1] = value >> 8     # OLATB
+        self._n = n + 2
+
+    def _strobe(self, state: int) -> int:
+        """Добавляет в посылку состояние state со стробом E (1, затем 0). Возвращает последнее состояние"""
+        self._put(state | self._e)
+        self._put(state)
+        return state
+
+    def _nibble(self, value: int, rs: int = 0) -> int:
+        """Добавляет в посылку 4 бита value (D4..D7) со стробом E"""
+        return self._strobe(self._base | rs | self._lut[value & 0x0F])
+
+    def _byte(self, value: int, data: bool):
+        """Добавляет в посылку байт value: данные (data) или команду"""
+        rs = self._rs if data else 0
+        if self._four_bit:
+            self._nibble(value >> 4, rs)
+            state = self._nibble(value, rs)
+        else:
+            state = self._strobe(self._base | rs | self._lut[value])
+        for _ in range(self.settle):
+            self._put(state)
+
+    def _send(self):
+        """Выводит посылку одной транзакцией (stream_output)"""
+        if not self._n:
+            return
+        expander = self.expander
+        port = expander.active_port
+        if expander._bank:
+            if self._used > 0xFF and self._used & 0xFF:
+                raise ValueError("In 8 bit mode all LCD pins must be on the same port!")
+            expander.active_port = 1 if self._used > 0xFF else 0
+        try:
+            expander.stream_output(memoryview(self._tx)[:self._n], len(self._tx))
+        finally:
+            expander.active_port = port
+        self._n = 0
+
+    def command(self, cmd: int):
+        """Выполняет команду ЖКИ"""
+        self._begin()
+        self._byte(cmd, False)
+        self._send()
+        if cmd < 0x04:  # clear, home: 1.52 мс
+            time.sleep_ms(2)
+
+    def clear(self):
+        """Очищает ЖКИ и буфер кадра"""
+        self.command(0x01)
+        for i in range(len(self.frame)):
+            self._shown[i] = self.frame[i] = 0x20
+
+    @property
+    def backlight(self) -> bool:
+        return self._backlight
+
+    @backlight.setter
+    def backlight(self, value: bool):
+        self._backlight = value
+        if self._bl:
+            self.expander._update_pins(0x0A, self._bl, self._bl if value else 0)
+
+    def write(self, text: [str, bytes], row: int = 0, col: int = 0):
+        """Записывает текст в буфер кадра, начиная с позиции row, col. Текст, не поместившийся в строку, отбрасывается.
+        На ЖКИ текст выводится методом show"""
+        check_value(row, range(self.rows), f"Invalid row value: {row}")
+        check_value(col, range(self.cols), f"Invalid col value: {col}")
+        if isinstance(text, str):
+            text = text.encode()
+        start = row * self.cols + col
+        n = max(0, min(len(text), self.cols - col))
+        self.frame[start:start + n] = text[:n]
+
+    def show(self) -> int:
+        """Выводит на ЖКИ знакоместа буфера кадра, которые отличаются от показанных, одной транзакцией.
+        Серии изменившихся знакомест, разделенные одним неизменным, объединяются (это дешевле команды адреса).
+        Возвращает кол-во переданных знакомест"""
+        frame, shown, cols = self.frame, self._shown, self.cols
+        sent = 0
+        self._begin()
+        for row in range(self.rows):
+            start = row * cols
+            col = 0
+            while col < cols:
+                if frame[start + col] == shown[start + col]:
+                    col += 1
+                    continue
+                last = j = col  # last - последнее изменившееся знакоместо серии
+                while j < cols and j - last <= 1:
+                    if frame[start + j] != shown[start + j]:
+                        last = j
+                    j += 1
+                self._byte(0x80 | (self._row_addr[row] + col), False)   # set DDRAM address
+                for i in range(start + col, start + last + 1):
+                    self._byte(frame[i], True)
+                    shown[i] = frame[i]
+                sent += last + 1 - col
+                col = last + 1
+        self._send()
+        return sent
@@ -0,0 +1,201 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Заменитель модуля machine для запуска кода под CPython (на хосте).
+Шины I2C и SPI не имеют физического подключения. К ним присоединяются модели устройств (смотри mcp23017sim).
+Шины подсчитывают количество транзакций, байт и расчетное время занятости шины.
+
+machine module stand-in for running the code under CPython (on the host).
+I2C and SPI buses are backed by device models (see mcp23017sim). The buses count transactions, bytes
+and the estimated bus time."""
+import errno
+
+
+class Pin:
+    """Вывод MCU. Изменение уровня вызывает обработчик прерывания (irq) и слушателей (модели устройств)"""
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode: int = -1, pull: int = -1, value: int = None):
+        self.id = id
+        self._value = 0
+        self._handler = None
+        self._trigger = 0
+        # функции вида listener(pin, value), вызываемые при изменении уровня
+        self.listeners = list()
+        self.init(mode, pull, value)
+
+    def init(self, mode: int = -1, pull: int = -1, value: int = None):
+        if value is not None:
+            self.value(value)
+        elif self.PULL_UP == pull:
+            self.value(1)
+
+    def value(self, x=None):
+        if x is None:
+            return self._value
+        x = 1 if x else 0
+        old, self._value = self._value, x
+        if old == x:
+            return
+        for listener in self.listeners:
+            listener(self, x)
+        edge = self.IRQ_RISING if x else self.IRQ_FALLING
+        if self._handler and self._trigger & edge:
+            self._handler(self)
+
+    def __call__(self, x=None):
+        return self.value(x)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger: int = IRQ_FALLING | IRQ_RISING, hard: bool = False):
+        self._handler = handler
+        self._trigger = trigger
+
+
+class _Bus:
+    """Общая часть моделей шин: счетчики транзакций, байт и времени занятости шины"""
+    def __init__(self, freq: int):
+        self.freq = freq
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_time_us = 0.0
+
+    def _account(self, n_bytes: int, bits_per_byte: int, overhead_bits: int = 0):
+        self.transactions += 1
+        self.bytes += n_bytes
+        self.bus_time_us += 1E6 * (n_bytes * bits_per_byte + overhead_bits) / self.freq
+
+
+class I2C(_Bus):
+    """Шина I2C. Модель устройства должна иметь методы i2c_write(data: bytes) и i2c_read(n: int) -> bytes.
+    Первый записываемый байт - адрес регистра (указатель), как у MCP23017"""
+    def __init__(self, id=0, *, scl=None, sda=None, freq: int = 400_000, timeout: int = 50_000):
+        super().__init__(freq)
+        self.id = id
+        self.devices = dict()
+
+    def attach(self, address: int, device):
+        self.devices[address] = device
+
+    def _device(self, addr: int):
+        try:
+            return self.devices[addr]
+        except KeyError:
+            raise OSError(errno.ENODEV) from None
+
+    def scan(self) -> list:
+        return sorted(self.devices)
+
+    # 9 бит на байт (8 бит + ACK), 2 бита на START/STOP
+    def readfrom_mem(self, addr: int, memaddr: int, nbytes: int, *, addrsize: int = 8) -> bytes:
+        dev = self._device(addr)
+        dev.i2c_write(bytes((memaddr,)))
+        self._account(3 + nbytes, 9, 3)
+        return bytes(dev.i2c_read(nbytes))
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf, *, addrsize: int = 8):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf))
+
+    def writeto_mem(self, addr: int, memaddr: int, buf, *, addrsize: int = 8):
+        dev = self._device(addr)
+        dev.i2c_write(bytes((memaddr,)) + bytes(buf))
+        self._account(2 + len(buf), 9, 2)
+
+    def readfrom(self, addr: int, nbytes: int, stop: bool = True) -> bytes:
+        dev = self._device(addr)
+        self._account(1 + nbytes, 9, 2)
+        return bytes(dev.i2c_read(nbytes))
+
+    def readfrom_into(self, addr: int, buf, stop: bool = True):
+        buf[:] = self.readfrom(addr, len(buf), stop)
+
+    def writeto(self, addr: int, buf, stop: bool = True) -> int:
+        dev = self._device(addr)
+        dev.i2c_write(bytes(buf))
+        self._account(1 + len(buf), 9, 2)
+        return len(buf)
+
+
+class SPI(_Bus):
+    """Шина SPI. Модель устройства должна иметь метод spi_exchange(byte: int) -> int, который вызывается
+    для каждого байта, пока вывод выбора (chip select) устройства в низком уровне (смотри атрибут selected)"""
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id=0, baudrate: int = 1_000_000, *, polarity: int = 0, phase: int = 0, bits: int = 8,
+                 firstbit: int = MSB, sck=None, mosi=None, miso=None):
+        super().__init__(baudrate)
+        self.id = id
+        self.devices = list()
+
+    def attach(self, device):
+        self.devices.append(device)
+
+    def _exchange(self, out_byte: int) -> int:
+        res = 0xFF      # невыбранное устройство не управляет MISO (подтяжка к 1)
+        for dev in self.devices:
+            if dev.selected:
+                res &= dev.spi_exchange(out_byte)
+        return res
+
+    def write(self, buf):
+        for b in buf:
+            self._exchange(b)
+        self._account(len(buf), 8)
+
+    def read(self, nbytes: int, write: int = 0x00) -> bytes:
+        res = bytes(self._exchange(write) for _ in range(nbytes))
+        self._account(nbytes, 8)
+        return res
+
+    def readinto(self, buf, write: int = 0x00):
+        for i in range(len(buf)):
+            buf[i] = self._exchange(write)
+        self._account(len(buf), 8)
+
+    def write_readinto(self, write_buf, read_buf):
+        for i, b in enumerate(write_buf):
+            read_buf[i] = self._exchange(b)
+        self._account(len(write_buf), 8)
+
+
+class Timer:
+    """Таймер. На хосте не срабатывает сам, обработчик вызывается методом fire"""
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self._callback = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, *, mode: int = PERIODIC, freq: float = -1, period: int = -1, callback=None):
+        self._callback = callback
+
+    def deinit(self):
+        self._callback = None
+
+    def fire(self):
+        if self._callback:
+            self._callback(self)
@@ -0,0 +1,253 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Модель регистров MCP23017/MCP23S17 для запуска и проверки драйвера на хосте без аппаратуры.
+Моделируется:
+    - адресация регистров при IOCON.BANK = 0 и IOCON.BANK = 1;
+    - указатель адреса при IOCON.SEQOP = 0 (инкремент) и IOCON.SEQOP = 1 (пара A/B при BANK = 0, фиксирован
+      при BANK = 1);
+    - IOCON, доступный по адресам 0x0A/0x0B (BANK = 0) или 0x05/0x15 (BANK = 1). Бит 0 IOCON всегда читается, как 0;
+    - запись в GPIO изменяет OLAT, INTF и INTCAP только для чтения;
+    - прерывание при изменении (GPINTEN, INTCON, DEFVAL), захват INTF/INTCAP, сброс прерывания чтением GPIO или
+      INTCAP, выходы INTA/INTB (MIRROR, ODR, INTPOL);
+    - кадр SPI MCP23S17: код операции 0b0100_A2_A1_A0_RW, адрес регистра, данные. Аппаратный адрес учитывается
+      только при IOCON.HAEN = 1.
+
+Register-file model of MCP23017/MCP23S17 for running and checking the driver on the host without hardware.
+
+Каталог host должен быть в sys.path раньше остальных, тогда вместо machine, micropython и ustruct загружаются
+заменители из него. Пример/Example:
+    import sys
+    sys.path.insert(0, "host")
+    from machine import I2C
+    from mcp23017sim import MCP23017Sim
+    from sensor_pack.bus_service import I2cAdapter
+    import mcp23017mod
+
+    i2c = I2C(1)
+    chip = MCP23017Sim(i2c, address=0x27)
+    expander = mcp23017mod.MCP23017(I2cAdapter(i2c))
+    chip.drive(0x00FF)          # уровни на выводах ввода
+    print(expander.gpio, i2c.transactions, i2c.bus_time_us)"""
+
+# индексы регистров, смотри MCP23017._get_reg_address
+IODIR, IPOL, GPINTEN, DEFVAL, INTCON, IOCON, GPPU, INTF, INTCAP, GPIO, OLAT = range(11)
+
+
+class MCP23017Sim:
+    """Модель микросхемы. Выводы нумеруются 0..15: 0..7 - порт A (GPA0..GPA7), 8..15 - порт B (GPB0..GPB7)"""
+    def __init__(self, i2c=None, address: int = 0x20):
+        self.address = address
+        # регистры портов A и B. IOCON общий для обоих портов, хранится в self.iocon
+        self.regs = [bytearray(11), bytearray(11)]
+        self.iocon = 0
+        # уровни, которые внешние цепи подают на выводы, настроенные на ввод
+        self.inputs = 0
+        # выводы MCU, к которым подключены INTA и INTB (machine.Pin)
+        self.int_pins = [None, None]
+        # состояние кадра SPI
+        self.selected = False
+        self.cs = None
+        self._frame_pos = 0
+        self._frame_read = False
+        self._frame_own = False
+        self._pointer = 0
+        self._last_levels = 0
+        self.reset()
+        if i2c is not None:
+            i2c.attach(address, self)
+
+    def reset(self):
+        """Состояние после включения питания (POR)"""
+        for port in self.regs:
+            port[:] = bytes(11)
+            port[IODIR] = 0xFF
+        self.iocon = 0
+        self._pointer = 0
+        self._last_levels = self.levels()
+        self._update_int()
+
+    @property
+    def bank(self) -> bool:
+        return bool(self.iocon & 0x80)
+
+    # адресация
+    def decode(self, addr: int):
+        """Возвращает (индекс регистра, порт) по адресу или None для не реализованного адреса"""
+        if self.bank:
+            index, port = addr & 0x0F, addr >> 4
+            if index > OLAT or port > 1:
+                return None
+            return index, port
+        if addr > 0x15:
+            return None
+        return addr >> 1, addr & 1
+
+    def _advance(self, addr: int) -> int:
+        if self.iocon & 0x20:   # SEQOP = 1, последовательный режим выключен
+            return addr if self.bank else addr ^ 1
+        if self.bank:
+            return 0 if addr >= 0x1A else addr + 1
+        return 0 if addr >= 0x15 else addr + 1
+
+    # доступ к регистрам
+    def read_byte(self, addr: int) -> int:
+        reg = self.decode(addr)
+        if reg is None:
+            return 0
+        index, port = reg
+        regs = self.regs[port]
+        if IOCON == index:
+            return self.iocon
+        if GPIO == index:
+            value = self._gpio(port)
+            self._clear_int(port)
+            return value
+        if INTCAP == index:
+            value = regs[INTCAP]
+            self._clear_int(port)
+            return value
+        return regs[index]
+
+    def write_byte(self, addr: int, value: int):
+        reg = self.decode(addr)
+        if reg is None:
+            return
+        index, port = reg
+        if IOCON == index:
+            self.iocon = value & 0xFE
+            self._update_int()
+            return
+        if index in (INTF, INTCAP):
+            return
+        if GPIO == index:
+            index = OLAT
+        self.regs[port][index] = value
+        self._evaluate()
+
+    def read_reg(self, index: int, port: int) -> int:
+        """Значение регистра без побочных эффектов (для проверок)"""
+        if IOCON == index:
+            return self.iocon
+        if GPIO == index:
+            return self._gpio(port)
+        return self.regs[port][index]
+
+    # I2C
+    def i2c_write(self, data: bytes):
+        if not data:
+            return
+        self._pointer = data[0]
+        for b in data[1:]:
+            self.write_byte(self._pointer, b)
+            self._pointer = self._advance(self._pointer)
+
+    def i2c_read(self, n: int) -> bytes:
+        res = bytearray(n)
+        for i in range(n):
+            res[i] = self.read_byte(self._pointer)
+            self._pointer = self._advance(self._pointer)
+        return bytes(res)
+
+    # SPI (MCP23S17)
+    def spi_attach(self, spi, cs):
+        """Подключает модель к шине SPI (machine.SPI) с выводом выбора cs (machine.Pin)"""
+        self.cs = cs
+        self.selected = not cs.value()
+        cs.listeners.append(self._on_cs)
+        spi.attach(self)
+
+    def _on_cs(self, pin, value: int):
+        self.selected = not value
+        self._frame_pos = 0
+
+    def spi_exchange(self, out_byte: int) -> int:
+        pos = self._frame_pos
+        self._frame_pos += 1
+        if 0 == pos:
+            hw_addr = (self.address & 0x07) if self.iocon & 0x08 else 0     # IOCON.HAEN
+            self._frame_own = 0x40 | (hw_addr << 1) == out_byte & 0xFE
+            self._frame_read = bool(out_byte & 0x01)
+            return 0xFF
+        if not self._frame_own:
+            return 0xFF
+        if 1 == pos:
+            self._pointer = out_byte
+            return 0xFF
+        if self._frame_read:
+            res = self.read_byte(self._pointer)
+        else:
+            self.write_byte(self._pointer, out_byte)
+            res = 0xFF
+        self._pointer = self._advance(self._pointer)
+        return res
+
+    # выводы
+    def _port_levels(self, port: int) -> int:
+        regs = self.regs[port]
+        inputs = (self.inputs >> (port << 3)) & 0xFF
+        return (inputs & regs[IODIR]) | (regs[OLAT] & ~regs[IODIR] & 0xFF)
+
+    def levels(self) -> int:
+        """Уровни на всех 16 выводах микросхемы"""
+        return self._port_levels(0) | (self._port_levels(1) << 8)
+
+    def outputs(self) -> int:
+        """Уровни на выводах, настроенных на вывод. Выводы ввода читаются, как 0"""
+        return (self.regs[0][OLAT] & ~self.regs[0][IODIR] & 0xFF) | \
+            ((self.regs[1][OLAT] & ~self.regs[1][IODIR] & 0xFF) << 8)
+
+    def _gpio(self, port: int) -> int:
+        regs = self.regs[port]
+        ipol = regs[IPOL] & regs[IODIR]     # IPOL действует только на выводы ввода
+        return self._port_levels(port) ^ ipol
+
+    def drive(self, levels: int):
+        """Подает уровни levels (бит n - вывод n) на выводы, настроенные на ввод"""
+        self.inputs = levels & 0xFFFF
+        self._evaluate()
+
+    # прерывания
+    def _evaluate(self):
+        levels = self.levels()
+        last, self._last_levels = self._last_levels, levels
+        for port in 0, 1:
+            regs = self.regs[port]
+            shift = port << 3
+            cur = (levels >> shift) & 0xFF
+            prev = (last >> shift) & 0xFF
+            # INTCON = 0 - сравнение с предыдущим значением, INTCON = 1 - сравнение с DEFVAL
+            flags = ((cur ^ prev) & ~regs[INTCON]) | ((cur ^ regs[DEFVAL]) & regs[INTCON])
+            flags &= regs[GPINTEN]
+            if flags and not regs[INTF]:
+                regs[INTF] = flags
+                regs[INTCAP] = self._gpio(port)
+        self._update_int()
+
+    def _clear_int(self, port: int):
+        regs = self.regs[port]
+        regs[INTF] = 0
+        # при сравнении с DEFVAL прерывание возникает снова, пока условие выполняется
+        cur = self._port_levels(port)
+        flags = (cur ^ regs[DEFVAL]) & regs[INTCON] & regs[GPINTEN]
+        if flags:
+            regs[INTF] = flags
+            regs[INTCAP] = self._gpio(port)
+        self._update_int()
+
+    def int_active(self, port: int) -> bool:
+        """Истина, если выход INTA (port = 0) или INTB (port = 1) активен"""
+        if self.iocon & 0x40:   # MIRROR
+            return bool(self.regs[0][INTF] or self.regs[1][INTF])
+        return bool(self.regs[port][INTF])
+
+    def _update_int(self):
+        for port in 0, 1:
+            pin = self.int_pins[port]
+            if pin is None:
+                continue
+            active = self.int_active(port)
+            if self.iocon & 0x04:   # ODR, открытый сток, активный низкий уровень
+                pin.value(not active)
+            else:   # INTPOL
+                pin.value(active if self.iocon & 0x02 else not active)
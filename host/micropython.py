@@ -0,0 +1,74 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Заменитель модуля micropython для запуска кода под CPython (на хосте).
+Декораторы native/viper ничего не делают, функции выполняются интерпретатором CPython.
+Кроме того, модуль добавляет в time функции ticks_*, sleep_ms, sleep_us, а в builtins ptr8/ptr16/ptr32,
+которых нет в CPython.
+
+micropython module stand-in for running the code under CPython (on the host)."""
+import builtins
+import time
+
+
+def native(func):
+    return func
+
+
+def viper(func):
+    return func
+
+
+def const(value):
+    return value
+
+
+def schedule(func, arg):
+    """Под CPython отложенный вызов выполняется немедленно"""
+    func(arg)
+    return True
+
+
+def alloc_emergency_exception_buf(size: int):
+    pass
+
+
+def mem_info(verbose: bool = False):
+    pass
+
+
+def opt_level(level: int = None):
+    return 0
+
+
+# time.ticks_*
+_TICKS_PERIOD = 1 << 30
+_TICKS_HALF = _TICKS_PERIOD >> 1
+
+
+def _ticks_us() -> int:
+    return (time.perf_counter_ns() // 1000) & (_TICKS_PERIOD - 1)
+
+
+def _ticks_ms() -> int:
+    return (time.perf_counter_ns() // 1_000_000) & (_TICKS_PERIOD - 1)
+
+
+def _ticks_add(ticks: int, delta: int) -> int:
+    return (ticks + delta) & (_TICKS_PERIOD - 1)
+
+
+def _ticks_diff(ticks1: int, ticks2: int) -> int:
+    return ((ticks1 - ticks2 + _TICKS_HALF) & (_TICKS_PERIOD - 1)) - _TICKS_HALF
+
+
+for _name, _func in (("ticks_us", _ticks_us), ("ticks_ms", _ticks_ms), ("ticks_cpu", _ticks_us),
+                     ("ticks_add", _ticks_add), ("ticks_diff", _ticks_diff),
+                     ("sleep_ms", lambda ms: time.sleep(ms / 1000)), ("sleep_us", lambda us: time.sleep(us / 1e6))):
+    if not hasattr(time, _name):
+        setattr(time, _name, _func)
+
+# указатели viper. memoryview индексируется так же, как ptr8/ptr16/ptr32
+for _name, _fmt in (("ptr8", "B"), ("ptr16", "H"), ("ptr32", "I")):
+    if not hasattr(builtins, _name):
+        setattr(builtins, _name, lambda obj, fmt=_fmt: memoryview(obj).cast("B").cast(fmt))
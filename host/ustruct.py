@@ -0,0 +1,4 @@
+# CPython
+# MIT license
+"""Заменитель модуля ustruct для запуска кода под CPython (на хосте)."""
+from struct import *    # noqa: F401,F403
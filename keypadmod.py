@@ -0,0 +1,160 @@
+# micropython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Опрос матричной клавиатуры (до 8 x 8), подключенной к MCP23017: строки - выводы порта A, столбцы - выводы порта B.
+Matrix keypad (up to 8 x 8) scanner on MCP23017: rows on port A pins, columns on port B pins."""
+from mcp23017mod import MCP23017
+from sensor_pack.base_sensor import Iterator, check_value
+from sensor_pack.debouncer import Debouncer
+
+
+class Keypad(Iterator):
+    """Сканер матричной клавиатуры. Строки подключены к выводам 0..rows-1 порта A, столбцы - к выводам 0..cols-1
+    порта B, нажатая клавиша замыкает строку со столбцом. Все выводы подтянуты к питанию (GPPU), OLAT = 0.
+    Выбранная строка - выход (0), остальные строки - высокоимпедансные входы (IODIR), поэтому нажатие нескольких
+    клавиш не замыкает выходы между собой.
+
+    Опрос (scan) выполняется за минимальное кол-во транзакций:
+    - все строки - выходы, чтение GPIOB: если ни один столбец не в нуле, то клавиши отпущены (1 транзакция);
+    - иначе выводы переключаются (столбцы - выходы, строки - входы) и читается GPIOA - нажатые строки. Если нажата
+      одна строка или один столбец, то нажатые клавиши известны (всего 4 транзакции);
+    - иначе опрашиваются только нажатые строки, по 2 транзакции (запись IODIRA, чтение GPIOB) на строку.
+    Если клавиатура с диодами (diodes), то обратное чтение невозможно и опрашиваются все строки.
+
+    Клавиша номер row * cols + col - бит состояния с тем же номером.
+
+    Keypad scanner. Idle scan is one transaction, rows are scanned only while keys are pressed."""
+    def __init__(self, expander: MCP23017, rows: int = 8, cols: int = 8, samples: int = 3, diodes: bool = False,
+                 wake_pin=None):
+        """expander - расширитель портов. Переводится в режим 16 бит, выводы 0..rows-1 порта A и 0..cols-1 порта B
+        настраиваются для опроса клавиатуры.
+        rows, cols - кол-во строк и столбцов 1..8.
+        samples - кол-во одинаковых опросов подряд для изменения состояния клавиши (подавление дребезга).
+        diodes - клавиатура с диодами (нет фантомных нажатий, N-key rollover).
+        wake_pin - вывод MCU (machine.Pin, вход), подключенный к выходу INTB. Если задан, то в покое scan не
+        выполняет обмена по шине, пока нажатие клавиши не вызовет прерывание (interrupt-on-change столбцов)."""
+        check_value(rows, range(1, 9), f"Invalid rows value: {rows}")
+        check_value(cols, range(1, 9), f"Invalid cols value: {cols}")
+        self.expander = expander
+        self.rows = rows
+        self.cols = cols
+        self.diodes = diodes
+        self._row_mask = (1 << rows) - 1
+        self._col_mask = (1 << cols) - 1
+        # IODIR в порядке выводов (порт A - младший байт): все строки - выходы; строки - входы, столбцы - выходы
+        self._idle_dir = 0xFF00 | (~self._row_mask & 0xFF)
+        self._flip_dir = ((~self._col_mask & 0xFF) << 8) | 0xFF
+        self.debouncer = Debouncer(samples, width=rows * cols)
+        self.ghost = False      # при последнем опросе обнаружено фантомное нажатие, состояние не обновлено
+        self.transactions = 0   # кол-во транзакций последнего опроса
+        self._wake = True
+        self._int_buf = bytearray(3)    # INTFB, INTCAPA, INTCAPB (IOCON.BANK = 0)
+        expander.hex_mode = True
+        self._used = used = self._row_mask | (self._col_mask << 8)   # выводы клавиатуры
+        expander._update_pins(0x0A, used, 0)         # OLAT
+        expander._update_pins(1, used, 0)            # IPOL
+        expander._update_pins(6, used, used)         # GPPU
+        expander._update_pins(0, used, self._idle_dir)   # IODIR
+        self.wake_pin = wake_pin
+        if wake_pin is not None:
+            mask = self._col_mask << 8
+            expander._update_pins(4, mask, 0)       # INTCON, прерывание при изменении
+            expander._update_pins(2, mask, mask)    # GPINTEN
+            iocon = expander._get_iocon()
+            trigger = wake_pin.IRQ_RISING if 0x02 == iocon & 0x06 else wake_pin.IRQ_FALLING    # ODR = 0, INTPOL = 1
+            wake_pin.irq(handler=self._on_wake, trigger=trigger)
+            self._rearm()
+
+    def _on_wake(self, pin):
+        """Обработчик прерывания вывода wake_pin. Не выполняет обмена по шине"""
+        self._wake = True
+
+    def _rearm(self) -> bool:
+        """Сбрасывает прерывание чтением INTFB..INTCAPB (одна транзакция). Возвращает Истина, если после
+        предыдущего сброса уровень столбцов изменялся (флаги INTFB), тогда нужен следующий опрос"""
+        expander = self.expander
+        expander.adapter.read_buf_from_mem(expander.address, 0x0F, self._int_buf)  # 0x0F - INTFB
+        self._wake = bool(self._int_buf[0] & self._col_mask)
+        self.transactions += 1
+        return self._wake
+
+    def _write_dir(self, value: int):
+        """Записывает биты IODIR выводов клавиатуры одной транзакцией, направление остальных выводов не изменяется"""
+        expander = self.expander
+        iodir = expander._shadow_pins(0)
+        if iodir is None:
+            iodir = expander._read_pins_reg(0)
+        expander._write_pins_reg(0, (iodir & ~self._used) | (value & self._used))
+
+    def _scan_raw(self) -> [int, None]:
+        """Возвращает состояние клавиш или None, если обнаружено фантомное нажатие"""
+        expander = self.expander
+        cols = ~expander._read_byte(19) & self._col_mask   # 19 - GPIOB, все строки в нуле
+        self.transactions += 1
+        if not cols:
+            return 0
+        rows = self._row_mask
+        if not self.diodes:
+            self._write_dir(self._flip_dir)    # столбцы в нуле, строки - входы
+            rows = ~expander._read_byte(18) & self._row_mask   # 18 - GPIOA
+            self._write_dir(self._idle_dir)
+            self.transactions += 3
+            if not rows & (rows - 1) or not cols & (cols - 1):  # одна строка или один столбец
+                state = 0
+                for row in range(self.rows):
+                    if (rows >> row) & 1:
+                        state |= cols << (row * self.cols)
+                return state
+        state = 0
+        lines = 0   # маски столбцов уже опрошенных строк для поиска фантомных нажатий
+        ghost = False
+        for row in range(self.rows):
+            if not (rows >> row) & 1:
+                continue
+            expander._update_pins(0, self._row_mask, ~(1 << row))      # только строка row - выход
+            line = ~expander._read_byte(19) & self._col_mask
+            self.transactions += 2
+            # две строки, замкнутые на два общих столбца - прямоугольник, одна из его клавиш может быть фантомной
+            if not self.diodes:
+                prev = lines
+                while prev and not ghost:
+                    common = line & prev & 0xFF
+                    ghost = bool(common & (common - 1))
+                    prev >>= 8
+            lines = (lines << 8) | line
+            state |= line << (row * self.cols)
+        expander._update_pins(0, self._row_mask, self._idle_dir)
+        self.transactions += 1
+        return None if ghost else state
+
+    def scan(self) -> int:
+        """Опрашивает клавиатуру и возвращает состояние клавиш без дребезга. Маски клавиш, состояние которых
+        изменилось, - в атрибутах debouncer: changed, pressed, released.
+        При обнаружении фантомного нажатия (ghost) состояние не изменяется"""
+        self.transactions = 0
+        deb = self.debouncer
+        if self.wake_pin is not None and not self._wake and not deb.state:
+            deb.changed = deb.pressed = deb.released = 0
+            return deb.state
+        raw = self._scan_raw()
+        self.ghost = raw is None
+        if self.ghost:
+            deb.changed = deb.pressed = deb.released = 0
+            return deb.state
+        state = deb.update(raw)
+        if self.wake_pin is not None and not raw and not state:
+            self._rearm()
+        return state
+
+    def keys(self, mask: int):
+        """Генератор. Возвращает номера клавиш (row * cols + col), биты которых установлены в mask"""
+        key = 0
+        while mask:
+            if mask & 1:
+                yield key
+            mask >>= 1
+            key += 1
+
+    def __next__(self) -> int:
+        """Можно использовать как итератор: for state in keypad"""
+        return self.scan()
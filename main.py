@@ -34,17 +34,18 @@ if __name__ == '__main__':
     
     # настройка всех выводов порта A на ввод
     expander.active_port = 0
-    expander.io_dir = 0xFF      # 8 bit as input
-    expander.pull_up = 0xFF		# connect 8 pull up resistors
-    expander.input_polarity = 0		# GPIO register bit reflects the same logic state of the input pin.
+    with adapter.batch():       # записи в регистры объединяются в транзакции при выходе из блока
+        expander.io_dir = 0xFF      # 8 bit as input
+        expander.pull_up = 0xFF		# connect 8 pull up resistors
+        expander.input_polarity = 0		# GPIO register bit reflects the same logic state of the input pin.
     
     # вывод в консоль состояния порта expander.active_port. подключите к ним кнопки
     # между выводом порта и GND и смотрите, как меняется состояние битов! 
+    # генератор changes возвращает состояние только при изменении, период опроса в покое увеличивается до max_ms
     cnt = 0
     print(f"active_port: {expander.active_port} input test!")
-    for pin_state in expander:
-        time.sleep_ms(500)
-        print(f"pin binary state: b{pin_state:b}")
+    for pin_state, changed in expander.changes(min_ms=10, max_ms=500):
+        print(f"pin binary state: b{pin_state:b}; changed: b{changed:b}")
         cnt += 1
         if cnt > 50:
             break
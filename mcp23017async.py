@@ -0,0 +1,71 @@
+# micropython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Асинхронный (asyncio) интерфейс к MCP23017.
+Asynchronous (asyncio) interface to MCP23017."""
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+from mcp23017mod import MCP23017
+
+
+class MCP23017Async:
+    """Асинхронная обертка над MCP23017. Каждая операция с микросхемой выполняется под блокировкой шины
+    (adapter.lock), поэтому несколько расширителей и датчиков на одной шине получают ее по очереди, а пока одна
+    сопрограмма ждет шину, выполняются другие. Сама транзакция на шине остается блокирующей!
+
+    Asynchronous wrapper over MCP23017. Every operation is performed under the bus lock (adapter.lock)."""
+    def __init__(self, expander: MCP23017, period_ms: int = 20):
+        """expander - расширитель портов.
+        period_ms - период опроса выводов асинхронным итератором (async for), мс."""
+        self.expander = expander
+        self.period_ms = period_ms
+        self._last = None
+
+    async def call(self, method, *args):
+        """Вызывает метод method расширителя (например, MCP23017.set_io_dir) под блокировкой шины.
+        Возвращает результат вызова"""
+        async with self.expander.adapter.lock:
+            return method(self.expander, *args)
+
+    async def read_gpio(self, port: int = None) -> int:
+        """Возвращает значение GPIO порта port. Если port равен None, то текущего активного порта.
+        Активный порт расширителя не изменяется"""
+        expander = self.expander
+        async with expander.adapter.lock:
+            prev = expander.active_port
+            if port is not None:
+                expander.active_port = port
+            try:
+                return expander.get_gpio()
+            finally:
+                expander.active_port = prev
+
+    async def write_gpio(self, value: int, port: int = None):
+        """Записывает значение в GPIO порта port. Если port равен None, то текущего активного порта.
+        Активный порт расширителя не изменяется"""
+        expander = self.expander
+        async with expander.adapter.lock:
+            prev = expander.active_port
+            if port is not None:
+                expander.active_port = port
+            try:
+                expander.set_gpio(value)
+            finally:
+                expander.active_port = prev
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> int:
+        """Ожидает изменения состояния выводов текущего активного порта и возвращает новое значение.
+        Состояние читается итератором MCP23017 (next) с периодом period_ms"""
+        while True:
+            async with self.expander.adapter.lock:
+                value = next(self.expander)
+            if value != self._last:
+                self._last = value
+                return value
+            await asyncio.sleep(self.period_ms / 1000)
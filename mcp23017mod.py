@@ -2,23 +2,168 @@
 # MIT license
 # Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
 import micropython
+import time
 
 from sensor_pack import bus_service
 from sensor_pack.base_sensor import Device, Iterator, check_value
 
+# битовая маска индексов регистров (смотри _get_reg_address), значения которых изменяются только записью в них:
+# IODIR, IPOL, GPINTEN, DEFVAL, INTCON, IOCON, GPPU, OLAT. Значения INTF, INTCAP, GPIO изменяет сама микросхема!
+_CACHEABLE = 0b100_0111_1111
+# адреса регистров по позиции (index << 1) | port при IOCON.BANK = 0 и при IOCON.BANK = 1
+_ADDR_BANK0 = bytes(range(22))
+_ADDR_BANK1 = bytes((pos >> 1) | ((pos & 1) << 4) for pos in range(22))
+# образ регистров (как у snapshot) после POR: IODIR = 0xFF, остальные регистры в нуле, IOCON.BANK = 0
+POR_IMAGE = b"\xff\xff" + bytes(20)
+# позиции в порядке возрастания адресов регистров при IOCON.BANK = 0 и при IOCON.BANK = 1
+_ORDER_BANK1 = bytes(sorted(range(22), key=lambda pos: _ADDR_BANK1[pos]))
+# позиции регистров, задаваемых PinProfile: IODIR, IPOL, GPINTEN, DEFVAL, INTCON, GPPU (OLAT - смотри PinProfile)
+_PROFILE_POS = 0b11_0011_1111_1111
+
+# роли выводов для PinProfile. Объединяются операцией |, например PIN_IN | PIN_PULL_UP | PIN_IRQ
+PIN_IN = 0x00           # вход (как после POR)
+PIN_OUT = 0x01          # выход
+PIN_PULL_UP = 0x02      # подтягивающий резистор 100 кОм (GPPU)
+PIN_INVERT = 0x04       # инверсия входа (IPOL)
+PIN_IRQ = 0x08          # прерывание при любом изменении состояния входа (INTCON = 0)
+PIN_IRQ_LOW = 0x10      # прерывание, пока на входе 0 (INTCON = 1, DEFVAL = 1)
+PIN_IRQ_HIGH = 0x20     # прерывание, пока на входе 1 (INTCON = 1, DEFVAL = 0)
+PIN_HIGH = 0x40         # уровень выхода 1 (OLAT). Если не задан ни PIN_HIGH, ни PIN_LOW, то OLAT вывода не изменяется
+PIN_LOW = 0x80          # уровень выхода 0 (OLAT)
+
+
+class PinProfile:
+    """Декларативная конфигурация выводов MCP23017: роль каждого вывода (смотри константы PIN_...).
+    Компилируется один раз, в конструкторе, в образ регистров IODIR, IPOL, GPINTEN, DEFVAL, INTCON, GPPU, OLAT
+    (байты расположены, как у snapshot). Применяется методом MCP23017.apply_profile.
+
+    Declarative pin configuration compiled once into register values. Applied by MCP23017.apply_profile."""
+    def __init__(self, roles: [dict, tuple, list], default: int = PIN_IN):
+        """roles - словарь {вывод: роль} или последовательность из 16 ролей. Вывод n (0..15): бит n, порт A - выводы
+        0..7, порт B - выводы 8..15.
+        default - роль выводов, отсутствующих в словаре roles."""
+        if not isinstance(roles, dict):
+            if 16 != len(roles):
+                raise ValueError(f"Invalid roles length: {len(roles)}!")
+            roles = dict(enumerate(roles))
+        for pin in roles:
+            check_value(pin, range(16), f"Invalid pin value: {pin}!")
+        # значения регистров в порядке выводов по индексу регистра (смотри MCP23017._get_reg_address)
+        regs = [0 for _ in range(11)]
+        olat = olat_mask = 0
+        for pin in range(16):
+            role = roles.get(pin, default)
+            if PIN_IRQ_LOW & role and PIN_IRQ_HIGH & role or PIN_HIGH & role and PIN_LOW & role:
+                raise ValueError(f"Conflicting roles of pin {pin}: 0x{role:x}!")
+            bit = 1 << pin
+            if not PIN_OUT & role:
+                regs[0] |= bit
+            if PIN_INVERT & role:
+                regs[1] |= bit
+            if (PIN_IRQ | PIN_IRQ_LOW | PIN_IRQ_HIGH) & role:
+                regs[2] |= bit
+            if PIN_IRQ_LOW & role:
+                regs[3] |= bit
+            if (PIN_IRQ_LOW | PIN_IRQ_HIGH) & role:
+                regs[4] |= bit
+            if PIN_PULL_UP & role:
+                regs[6] |= bit
+            if (PIN_HIGH | PIN_LOW) & role:
+                olat_mask |= bit
+                if PIN_HIGH & role:
+                    olat |= bit
+        self.image = bytearray(22)
+        for index in range(11):
+            self.image[index << 1] = regs[index] & 0xFF
+            self.image[(index << 1) | 1] = regs[index] >> 8
+        self.olat = olat
+        self.olat_mask = olat_mask
+
+    def get(self, index: int) -> int:
+        """Возвращает значение регистра с индексом index (смотри MCP23017._get_reg_address) в порядке выводов"""
+        pos = index << 1
+        return self.image[pos] | (self.image[pos + 1] << 8)
+
 
 class MCP23017(Device, Iterator):
     """MicroPython class for control 16-Bit I/O Expander with Serial Interface"""
-    def __init__(self, adapter: bus_service.BusAdapter, address: int = 0x27):
+    def __init__(self, adapter: bus_service.BusAdapter, address: int = 0x27, use_cache: bool = False,
+                 events: int = 16, bank: bool = None, image: [bytes, bytearray] = None, hex_mode: bool = False):
         """eight_bit_mode - если Истина, то два порта (8-бит) ввода/вывода работают отдельно друг от друга.
-        Иначе, два порта (8-бит) ввода/вывода объединяются в один (16 бит) порт ввода/вывода"""
+        Иначе, два порта (8-бит) ввода/вывода объединяются в один (16 бит) порт ввода/вывода
+        adapter - адаптер шины I2C (MCP23017) или SPI (MCP23S17, смотри SpiAdapter, параметр cs).
+        address - адрес микросхемы 0x20 | A2A1A0 (для MCP23S17 тоже).
+        use_cache - если Истина, то значения регистров конфигурации возвращаются из теневой копии, без обмена по шине.
+        Смотри invalidate и resync.
+        events - емкость очереди событий прерывания. Смотри setup_interrupt, attach_irq, service_interrupt.
+        bank - текущее значение IOCON.BANK микросхемы, если оно известно заранее (после POR - False). Если None, то
+        адресация определяется опросом IOCON (12 транзакций, с записью в регистры!). Одной транзакцией BANK не
+        определить: любой адрес IOCON при другой адресации принадлежит обычному регистру с произвольным значением.
+        image - известный образ регистров микросхемы (snapshot или POR_IMAGE). Задает IOCON.BANK и заполняет
+        теневую копию без обмена по шине. Для MCP23S17 первый экземпляр на адаптере должен получить bank или image
+        (смотри _enable_haen).
+        hex_mode - режим 16 бит (Истина) или два порта по 8 бит. IOCON записывается, только если адресация меняется,
+        поэтому MCP23017(adapter, image=POR_IMAGE, hex_mode=True) не выполняет ни одной транзакции."""
         s0 = f"Invalid address value: 0x{address:x}!"
         check_value(address, range(0x20, 0x28), s0)
         super().__init__(adapter, address, big_byte_order=True)
+        # MCP23S17 (шина SPI). Бит IOCON.HAEN всегда установлен, иначе микросхема не различает адрес 0x20 | A2A1A0
+        self._haen = 0x08 if hasattr(adapter.get_bus_type(), "write_readinto") else 0
+        # теневая копия регистров обоих портов. Байты расположены, как при IOCON.BANK = 0: (index << 1) | port
+        self._shadow = bytearray(22)
+        self._valid = 0     # битовая маска достоверных байт теневой копии
+        self._use_cache = use_cache
+        # буферы для чтения регистров без выделения памяти в куче (8 и 16 бит)
+        self._buf1 = bytearray(1)
+        self._buf2 = bytearray(2)
+        # буфер INTF/INTCAP обоих портов и кольцевая очередь событий прерывания (port, changed_mask, captured_value)
+        self._irq_buf = bytearray(4)
+        mv = memoryview(self._irq_buf)
+        self._irq_halves = mv[0:2], mv[2:4]
+        self._ev_port = bytearray(events)
+        self._ev_mask = bytearray(events)
+        self._ev_cap = bytearray(events)
+        self._ev_head = 0   # индекс записи (обработчик прерывания)
+        self._ev_tail = 0   # индекс чтения
+        self._ev_lost = 0   # кол-во событий, не поместившихся в очередь
+        self._pin_irq = None    # обработчики прерываний выводов (смотри set_pin_irq)
+        self._ev_handlers = None    # обработчики событий прерывания (смотри add_event_handler)
+        self._hold = 0      # глубина вложенности hold
+        self._held = 0      # маска выводов, значение OLAT которых изменено после hold и еще не записано
+        if self._haen:
+            self._enable_haen(bank, image)
         # после POR IOCON.BANK = 0 всегда!
-        self._bank = self._get_addr_mode()  # то же самое, что и IOCON.BANK. После POR он в нуле!
+        if image is not None:
+            if 22 != len(image):
+                raise ValueError(f"Invalid image length: {len(image)}!")
+            self._bank = bool(image[10] & 0x80)
+            self._load_shadow(image)
+            self._shadow[10] |= self._haen
+            self._shadow[11] |= self._haen
+        elif bank is not None:
+            self._bank = bool(bank)
+        else:
+            self._bank = self._get_addr_mode()  # то же самое, что и IOCON.BANK. После POR он в нуле!
         self._active_port = 0
-        self._setup()
+        self._setup(hex_mode)
+
+    def _enable_haen(self, bank: [bool, None], image: [bytes, bytearray, None]):
+        """Устанавливает IOCON.HAEN MCP23S17. Пока HAEN = 0, микросхема отвечает на адрес 0x20, поэтому запись
+        получают все микросхемы с HAEN = 0 на общем выводе выбора (и микросхема с адресом 0x20). Выполняется один раз
+        для адаптера (вывода выбора), при создании первого экземпляра, чтобы не испортить регистры уже настроенных
+        микросхем (смотри SpiAdapter.haen).
+        Адрес IOCON зависит от BANK, поэтому для первого экземпляра он должен быть известен (image или bank): при
+        BANK = 1 адрес IOCON при BANK = 0 (0x0A) - это OLATA, и запись изменила бы выходы"""
+        if self.adapter.haen:
+            return
+        if image is not None:
+            iocon = image[10] & 0xFE
+        elif bank is not None:
+            iocon = 0x80 if bank else 0x00
+        else:
+            raise ValueError("MCP23S17: bank or image must be specified for the first chip on the chip select!")
+        self.adapter.write_register(0x20, 0x05 if iocon & 0x80 else 0x0A, iocon | 0x08, 1, "big")
+        self.adapter.haen = True
 
     def _get_addr_mode(self) -> bool:
         """Текущая адресация.
@@ -36,6 +181,96 @@ class MCP23017(Device, Iterator):
                 return i != 0       # если в младших битах нули, а я выше писал в них единицы, то это IOCON!
         return False
 
+    @property
+    def use_cache(self) -> bool:
+        """Возвращает Истина, если значения регистров конфигурации читаются из теневой копии"""
+        return self._use_cache
+
+    @use_cache.setter
+    def use_cache(self, value: bool):
+        self._use_cache = value
+
+    def invalidate(self):
+        """Объявляет теневую копию регистров недостоверной. Вызывайте после сброса микросхемы или если ее регистры
+        мог изменить другой ведущий (master) шины. Следующее чтение каждого регистра пойдет на шину."""
+        self._valid = 0
+
+    def resync(self):
+        """Перечитывает с шины в теневую копию все регистры конфигурации обоих портов"""
+        self.snapshot()
+
+    def snapshot(self) -> bytes:
+        """Возвращает образ всех регистров микросхемы (22 байта, оба порта), считанный последовательным чтением.
+        Байты в образе всегда расположены, как при IOCON.BANK = 0 (пары регистров A/B), независимо от текущей
+        адресации. При IOCON.BANK = 0 образ читается одной транзакцией, при IOCON.BANK = 1 - двумя (по одной на порт).
+        Внимание! Чтение INTCAP и GPIO сбрасывает прерывание."""
+        seqop = self._seq_begin()
+        try:
+            if self._bank:
+                image = bytearray(22)
+                for port in 0, 1:
+                    block = self._read_reg(port << 4, 11)
+                    for index in range(11):
+                        image[(index << 1) | port] = block[index]
+            else:
+                image = self._read_reg(0x00, 22)
+            self._load_shadow(image)
+        finally:
+            self._seq_end(seqop)
+        return bytes(image)
+
+    def restore(self, image: [bytes, bytearray]):
+        """Записывает в микросхему образ регистров, полученный методом snapshot.
+        Образ записывается при текущей адресации одной (IOCON.BANK = 0) или двумя (IOCON.BANK = 1) транзакциями,
+        затем, если нужно, записывается IOCON из образа (в том числе и бит BANK).
+        INTF и INTCAP доступны только для чтения, а в GPIO записывается значение OLAT из образа.
+        После записи IOCON (и бит SEQOP) имеет значение из образа."""
+        if 22 != len(image):
+            raise ValueError(f"Invalid image length: {len(image)}!")
+        self._seq_begin()
+        iocon = (image[10] & 0xFE) | self._haen
+        # во время записи образа IOCON сохраняет текущую адресацию и последовательный режим (SEQOP = 0)
+        cur = (iocon & 0x5E) | (self._bank << 7)
+        buf = bytearray(image)
+        buf[10] = buf[11] = cur
+        buf[18], buf[19] = buf[20], buf[21]     # GPIO <- OLAT
+        self._write_image(buf)
+        self._load_shadow(buf)
+        if iocon != cur:
+            self._write_iocon(iocon)
+            self.active_port = self._active_port    # в режиме 16 бит активен только порт 0
+
+    def _write_image(self, image: [bytes, bytearray]):
+        """Записывает образ регистров (байты расположены, как при IOCON.BANK = 0) при текущей адресации"""
+        if not self._bank:
+            self._write_reg(0x00, image, 22)
+            return
+        block = bytearray(11)
+        for port in 0, 1:
+            for index in range(11):
+                block[index] = image[(index << 1) | port]
+            self._write_reg(port << 4, block, 11)
+
+    def _load_shadow(self, image: [bytes, bytearray]):
+        """Копирует значения регистров конфигурации из образа в теневую копию"""
+        for pos in range(22):
+            if (_CACHEABLE >> (pos >> 1)) & 1:
+                self._shadow[pos] = image[pos]
+                self._valid |= 1 << pos
+
+    def _seq_begin(self) -> int:
+        """Выключает IOCON.SEQOP перед обменом с несколькими регистрами одной транзакцией (адрес должен
+        увеличиваться). Возвращает прежнее значение бита для _seq_end"""
+        seqop = self._get_iocon() & 0x20
+        if seqop:
+            self._set_seqop(False)
+        return seqop
+
+    def _seq_end(self, seqop: int):
+        """Восстанавливает IOCON.SEQOP, выключенный _seq_begin"""
+        if seqop:
+            self._set_seqop(True)
+
     @property
     def active_port(self) -> int:
         """возвращает текущий порт, над которым производятся операции чтения и записи!"""
@@ -66,21 +301,114 @@ class MCP23017(Device, Iterator):
             # self._bank = False
             self.active_port = 0
 
-        self._setup_iocon(bank=not value, mirror=False, seqop=False)
+        self._setup_iocon(bank=not value)
 
     def _read_reg_by_index(self, index: int) -> int:
-        """Чтение регистра по его индексу и текущему активному порту"""
-        addr = self._get_reg_address(index)[self.active_port]    #
-        bytes_count = 2 if self.hex_mode else 1  # кол-во байт
-        res = self._read_reg(addr, bytes_count)  # bytes
-        fmt = "H" if self.hex_mode else "B"  # формат (H - unsigned short/B - unsigned byte)
-        return self.unpack(fmt, res)[0]
+        """Чтение регистра по его индексу и текущему активному порту.
+        При включенном кэшировании (use_cache) значения регистров конфигурации берутся из теневой копии"""
+        if self._use_cache:
+            return self._read_shadowed(index)
+        return self._read_chip(index)
+
+    def _read_shadowed(self, index: int) -> int:
+        """Чтение регистра по его индексу и текущему активному порту из теневой копии.
+        Если значение в теневой копии недостоверно, то регистр читается с шины"""
+        if (_CACHEABLE >> index) & 1:
+            pos = (index << 1) | self._active_port
+            if not self._bank:
+                if 0x03 == 0x03 & (self._valid >> pos):
+                    return (self._shadow[pos] << 8) | self._shadow[pos + 1]
+            elif 0x01 & (self._valid >> pos):
+                return self._shadow[pos]
+        return self._read_chip(index)
+
+    def _read_chip(self, index: int) -> int:
+        """Чтение регистра по его индексу и текущему активному порту с шины.
+        Не выделяет память в куче: адрес берется из таблицы, значение читается в заранее созданный буфер"""
+        if not 0 <= index < 11:
+            raise ValueError(f"Invalid index value: {index}!")
+        pos = (index << 1) | self._active_port
+        if self._bank:
+            buf = self._buf1
+            self.adapter.read_buf_from_mem(self.address, _ADDR_BANK1[pos], buf)
+            value = buf[0]
+        else:   # 16 бит, порядок байт big
+            buf = self._buf2
+            self.adapter.read_buf_from_mem(self.address, _ADDR_BANK0[pos], buf)
+            value = (buf[0] << 8) | buf[1]
+        if (_CACHEABLE >> index) & 1:
+            self._store(index, value)
+        return value
 
     def _write_reg_by_index(self, index: int, value: int):
         """Запись в регистр по его индексу и текущему активному порту"""
         addr = self._get_reg_address(index)[self.active_port]  #
         bytes_count = 2 if self.hex_mode else 1  # кол-во байт
         self._write_reg(addr, value, bytes_count)
+        self._store(0x0A if 9 == index else index, value)     # запись в GPIO изменяет OLAT
+
+    def _store(self, index: int, value: int):
+        """Сохраняет значение регистра текущего активного порта в теневой копии"""
+        if not (_CACHEABLE >> index) & 1:
+            return
+        pos = (index << 1) | self.active_port
+        if self.hex_mode:
+            self._shadow[pos] = (value >> 8) & 0xFF
+            self._shadow[pos + 1] = value & 0xFF
+            self._valid |= 0x03 << pos
+            return
+        self._shadow[pos] = value & 0xFF
+        self._valid |= 0x01 << pos
+
+    # доступ к регистрам обоих портов в порядке выводов: бит n - вывод n (0..15), порт A - младший байт.
+    # Не зависит от активного порта. При IOCON.BANK = 0 - одна транзакция, при IOCON.BANK = 1 - две.
+    def _read_pins_reg(self, index: int) -> int:
+        """Чтение регистра с индексом index обоих портов с шины в порядке выводов"""
+        pos = index << 1
+        if self._bank:
+            buf = self._buf1
+            self.adapter.read_buf_from_mem(self.address, _ADDR_BANK1[pos], buf)
+            lo = buf[0]
+            self.adapter.read_buf_from_mem(self.address, _ADDR_BANK1[pos + 1], buf)
+            hi = buf[0]
+        else:
+            buf = self._buf2
+            self.adapter.read_buf_from_mem(self.address, pos, buf)
+            lo, hi = buf[0], buf[1]
+        if (_CACHEABLE >> index) & 1:
+            self._shadow[pos] = lo
+            self._shadow[pos + 1] = hi
+            self._valid |= 0x03 << pos
+        return lo | (hi << 8)
+
+    def _write_pins_reg(self, index: int, value: int):
+        """Запись в регистр с индексом index обоих портов в порядке выводов"""
+        pos = index << 1
+        lo, hi = value & 0xFF, (value >> 8) & 0xFF
+        if self._bank:
+            buf = self._buf1
+            buf[0] = lo
+            self.adapter.write_buf_to_mem(self.address, _ADDR_BANK1[pos], buf)
+            buf[0] = hi
+            self.adapter.write_buf_to_mem(self.address, _ADDR_BANK1[pos + 1], buf)
+        else:
+            buf = self._buf2
+            buf[0], buf[1] = lo, hi
+            self.adapter.write_buf_to_mem(self.address, pos, buf)
+        if 9 == index:  # запись в GPIO изменяет OLAT
+            pos = 0x0A << 1
+        if (_CACHEABLE >> (pos >> 1)) & 1:
+            self._shadow[pos] = lo
+            self._shadow[pos + 1] = hi
+            self._valid |= 0x03 << pos
+
+    def _shadow_pins(self, index: int) -> [int, None]:
+        """Значение регистра с индексом index обоих портов из теневой копии в порядке выводов или None,
+        если оно недостоверно"""
+        pos = index << 1
+        if 0x03 != 0x03 & (self._valid >> pos):
+            return None
+        return self._shadow[pos] | (self._shadow[pos + 1] << 8)
 
     # PULL UP RESISTORS
     def get_pull_up(self) -> int:
@@ -129,6 +457,178 @@ class MCP23017(Device, Iterator):
     def output_latch(self, value):
         self.set_output_latch(value)
 
+    # изменение отдельных выводов. Текущее значение OLAT берется из теневой копии, поэтому каждый вызов - это
+    # одна транзакция записи на шине. Если OLAT мог изменить кто-то, кроме драйвера, вызовите invalidate()!
+    def write_masked(self, mask: int, value: int):
+        """Записывает в OLAT текущего активного порта биты value, выбранные маской mask.
+        Остальные биты OLAT не изменяются"""
+        mask &= 0xFFFF if self.hex_mode else 0xFF
+        old = self._read_shadowed(0x0A)     # 0x0A - OLAT
+        self.set_output_latch(old ^ ((old ^ value) & mask))
+
+    def set_pins(self, mask: int):
+        """Устанавливает в 1 биты OLAT текущего активного порта, выбранные маской mask"""
+        self.write_masked(mask, mask)
+
+    def clear_pins(self, mask: int):
+        """Сбрасывает в 0 биты OLAT текущего активного порта, выбранные маской mask"""
+        self.write_masked(mask, 0)
+
+    def toggle_pins(self, mask: int):
+        """Инвертирует биты OLAT текущего активного порта, выбранные маской mask"""
+        self.write_masked(mask, ~self._read_shadowed(0x0A))
+
+    # ДОСТУП К ОТДЕЛЬНЫМ ВЫВОДАМ (смотри mcp23017pin.ExpanderPin). Вывод n (0..15): бит n, порт A - выводы 0..7.
+    # Не зависит от активного порта. Изменяется только байт порта, в котором есть выводы маски.
+    def _read_byte(self, pos: int) -> int:
+        """Читает с шины байт регистра в позиции pos = (index << 1) | port при текущей адресации"""
+        buf = self._buf1
+        self.adapter.read_buf_from_mem(self.address, (_ADDR_BANK1 if self._bank else _ADDR_BANK0)[pos], buf)
+        if (_CACHEABLE >> (pos >> 1)) & 1:
+            self._shadow[pos] = buf[0]
+            self._valid |= 1 << pos
+        return buf[0]
+
+    def _read_bit(self, index: int, pin: int) -> int:
+        """Возвращает бит вывода pin регистра с индексом index. Значение берется из теневой копии, если оно
+        достоверно, иначе читается байт порта вывода (одна транзакция)"""
+        pos = (index << 1) | (pin >> 3)
+        if (_CACHEABLE >> index) & 1 and (self._valid >> pos) & 1:
+            return (self._shadow[pos] >> (pin & 0x07)) & 1
+        return (self._read_byte(pos) >> (pin & 0x07)) & 1
+
+    def _update_pins(self, index: int, mask: int, value: int):
+        """Записывает в регистр с индексом index (кроме GPIO) биты value выводов, выбранных маской mask.
+        Записываются (по одной транзакции) только байты портов, значение которых изменилось.
+        Изменения OLAT после hold только запоминаются в теневой копии и записываются методом commit"""
+        buf = self._buf1
+        for port in 0, 1:
+            m = (mask >> (port << 3)) & 0xFF
+            if not m:
+                continue
+            pos = (index << 1) | port
+            old = self._shadow[pos] if (self._valid >> pos) & 1 else self._read_byte(pos)
+            new = old ^ ((old ^ (value >> (port << 3))) & m)
+            if new == old:
+                continue
+            self._shadow[pos] = new
+            if 0x0A == index and self._hold:
+                self._held |= m << (port << 3)
+                continue
+            buf[0] = new
+            self.adapter.write_buf_to_mem(self.address, (_ADDR_BANK1 if self._bank else _ADDR_BANK0)[pos], buf)
+
+    def hold(self):
+        """Откладывает запись изменений OLAT отдельных выводов (ExpanderPin) до вызова commit. Изменения многих
+        выводов записываются одной транзакцией. Пары hold/commit могут быть вложенными"""
+        self._hold += 1
+
+    def commit(self):
+        """Завершает hold. Записывает изменения OLAT, отложенные после hold: одной транзакцией при IOCON.BANK = 0,
+        по одной транзакции на измененный порт при IOCON.BANK = 1"""
+        if self._hold:
+            self._hold -= 1
+        held = self._held
+        if self._hold or not held:
+            return
+        self._held = 0
+        if not self._bank and 0xFF < held and held & 0xFF:
+            self._write_pins_reg(0x0A, self._shadow_pins(0x0A))
+            return
+        buf = self._buf1
+        for port in 0, 1:
+            if (held >> (port << 3)) & 0xFF:
+                pos = (0x0A << 1) | port
+                buf[0] = self._shadow[pos]
+                self.adapter.write_buf_to_mem(self.address, (_ADDR_BANK1 if self._bank else _ADDR_BANK0)[pos], buf)
+
+    # ПОТОКОВЫЙ ВЫВОД. При IOCON.SEQOP = 1 адрес регистра после каждого байта не увеличивается (при IOCON.BANK = 0
+    # переключается между регистрами пары A/B), поэтому каждый байт одной транзакции записи - новое состояние выводов.
+    def pack_states(self, states) -> bytearray:
+        """Преобразует последовательность состояний выводов (в формате свойства gpio: 8 бит или 16 бит в режиме
+        16 бит, порт A - старший байт) в буфер для stream_output"""
+        if self._bank:
+            return bytearray(states)
+        buf = bytearray(len(states) << 1)
+        for i, value in enumerate(states):
+            buf[i << 1] = (value >> 8) & 0xFF
+            buf[(i << 1) + 1] = value & 0xFF
+        return buf
+
+    def stream_output(self, buffer, chunk: int = 256):
+        """Выводит последовательность состояний в OLAT текущего активного порта одной транзакцией записи на каждые
+        chunk байт буфера. Состояния сменяют друг друга со скоростью передачи байт по шине.
+        buffer - bytes, bytearray, memoryview или array('B'): в режиме 8 бит - байт на состояние, в режиме 16 бит -
+        пара байт OLATA, OLATB на состояние (длина буфера должна быть четной). Смотри pack_states.
+        chunk - не меньше одного состояния (в режиме 16 бит - четное кол-во байт).
+        Если IOCON.SEQOP уже установлен, то IOCON не записывается и после вызова не изменяется."""
+        n = len(buffer)
+        if self._bank:
+            chunk = max(1, chunk)
+        else:
+            if n & 1:
+                raise ValueError(f"Invalid buffer length: {n}! Two bytes per state in 16 bit mode.")
+            chunk = max(2, chunk & ~1)  # пара байт на состояние не должна делиться между транзакциями
+        if not n:
+            return
+        addr = self._get_reg_address(0x0A)[self._active_port]   # 0x0A - OLAT
+        mv = memoryview(buffer)
+        seqop = self._get_iocon() & 0x20
+        self._set_seqop(True)
+        try:
+            for i in range(0, n, chunk):
+                self.adapter.write_buf_to_mem(self.address, addr, mv[i:i + chunk])
+        finally:
+            if not seqop:
+                self._set_seqop(False)
+        if self._bank:
+            self._store(0x0A, buffer[n - 1])
+        else:
+            self._store(0x0A, (buffer[n - 2] << 8) | buffer[n - 1])
+
+    # ПОТОКОВЫЙ ВВОД. Как и при выводе, при IOCON.SEQOP = 1 каждый байт одной транзакции чтения GPIO - новая выборка
+    def sample_into(self, buf, count: int = None) -> int:
+        """Читает count выборок GPIO текущего активного порта в буфер buf одной транзакцией.
+        В режиме 8 бит - байт на выборку, в режиме 16 бит - пара байт GPIOA, GPIOB на выборку.
+        Если count равен None, то буфер заполняется целиком. Возвращает кол-во выборок"""
+        size = 1 if self._bank else 2
+        if count is None:
+            count = len(buf) // size
+        n = count * size
+        if n > len(buf):
+            raise ValueError(f"Buffer too small for {count} samples!")
+        if not n:
+            return 0
+        addr = self._get_reg_address(9)[self._active_port]  # 9 - GPIO
+        seqop = self._get_iocon() & 0x20
+        self._set_seqop(True)
+        try:
+            self.adapter.read_buf_from_mem(self.address, addr, memoryview(buf)[:n])
+        finally:
+            if not seqop:
+                self._set_seqop(False)
+        return count
+
+    def samples(self, count: int, chunk: int = 64):
+        """Генератор. Читает count выборок GPIO текущего активного порта блоками по chunk выборок (одна транзакция на
+        блок) и возвращает каждый блок, как memoryview внутреннего буфера (формат, как у sample_into).
+        Блок действителен только до следующей итерации! Пока генератор не исчерпан (или не закрыт), IOCON.SEQOP = 1,
+        поэтому не обращайтесь в это время к другим регистрам микросхемы."""
+        size = 1 if self._bank else 2
+        addr = self._get_reg_address(9)[self._active_port]  # 9 - GPIO
+        mv = memoryview(bytearray(chunk * size))
+        seqop = self._get_iocon() & 0x20
+        self._set_seqop(True)
+        try:
+            while count > 0:
+                n = (chunk if count > chunk else count) * size
+                self.adapter.read_buf_from_mem(self.address, addr, mv[:n])
+                yield mv[:n]
+                count -= chunk
+        finally:
+            if not seqop:
+                self._set_seqop(False)
+
     def get_io_dir(self) -> int:
         """Возвращает значение регистра IODIR.
         Управляет направлением ввода/вывода данных."""
@@ -231,6 +731,67 @@ class MCP23017(Device, Iterator):
         Регистр INTCAP содержит значение порта GPIO в момент возникновения прерывания."""
         return self._read_reg_by_index(8)
 
+    def apply_profile(self, profile: PinProfile, diff: bool = True) -> int:
+        """Записывает в микросхему конфигурацию выводов profile наименьшим кол-вом транзакций при текущей
+        адресации (hex_mode). Если diff Истина, то записываются только байты регистров, значения которых в теневой
+        копии отличаются от профиля или недостоверны. Смежные по адресу записи объединяются в одну транзакцию.
+        Промежутки между ними заполняются байтами, запись которых ничего не изменяет: известными значениями из теневой
+        копии, любыми значениями для INTF, INTCAP (только чтение) и значением OLAT для GPIO.
+        Возвращает кол-во выполненных транзакций записи."""
+        seqop = self._seq_begin()   # серии записей - последовательная адресация
+        try:
+            return self._apply_profile(profile, diff)
+        finally:
+            self._seq_end(seqop)
+
+    def _apply_profile(self, profile: PinProfile, diff: bool) -> int:
+        data = bytearray(self._shadow)
+        image = profile.image
+        need = _PROFILE_POS
+        for pos in range(22):
+            if (need >> pos) & 1:
+                data[pos] = image[pos]
+        if profile.olat_mask:
+            olat = self._shadow_pins(10)
+            if olat is None:
+                olat = self._read_pins_reg(10)
+            olat = (olat & ~profile.olat_mask) | profile.olat
+            data[20], data[21] = olat & 0xFF, olat >> 8
+            need |= 0x03 << 20
+        valid = self._valid
+        # байты, которые можно записать, не изменив состояния микросхемы: известные, INTF, INTCAP
+        fill = need | valid | (0x0F << 14)
+        for port in 0, 1:  # запись в GPIO изменяет OLAT
+            if (fill >> (20 | port)) & 1:
+                data[18 | port] = data[20 | port]
+                fill |= 1 << (18 | port)
+        if diff:
+            for pos in range(22):
+                if (need >> pos) & 1 and (valid >> pos) & 1 and data[pos] == self._shadow[pos]:
+                    need &= ~(1 << pos)
+        order = _ORDER_BANK1 if self._bank else _ADDR_BANK0
+        addrs = _ADDR_BANK1 if self._bank else _ADDR_BANK0
+        count = i = 0
+        while i < 22:
+            if not (need >> order[i]) & 1:
+                i += 1
+                continue
+            last = i    # последний байт, который нужно записать
+            j = i + 1
+            while j < 22 and addrs[order[j]] == 1 + addrs[order[j - 1]] and (fill >> order[j]) & 1:
+                if (need >> order[j]) & 1:
+                    last = j
+                j += 1
+            buf = bytes(data[order[k]] for k in range(i, 1 + last))
+            self._write_reg(addrs[order[i]], buf, len(buf))
+            count += 1
+            i = 1 + last
+        for pos in range(22):
+            if (need >> pos) & 1:
+                self._shadow[pos] = data[pos]
+        self._valid |= need
+        return count
+
     @micropython.native
     def _get_reg_address(self, index: int) -> [tuple, int]:
         """
@@ -251,42 +812,209 @@ class MCP23017(Device, Iterator):
         :param index:
         :return:
         """
-        s0 = f"Invalid index value: {index}!"
-        check_value(index, range(11), s0)
-        if self._bank:
-            x = index
-            return x, x + 0x10
-        # 16 bit mode
-        x = index << 1
-        return x, x + 1
+        if not 0 <= index < 11:
+            raise ValueError(f"Invalid index value: {index}!")
+        addrs = _ADDR_BANK1 if self._bank else _ADDR_BANK0
+        pos = index << 1
+        return addrs[pos], addrs[pos + 1]
 
-    def _setup_iocon(self, bank: bool, mirror: bool = False, seqop: bool = False, disslw: bool = False):
+    def _setup_iocon(self, bank: bool):
         """Setup IOCON register.
-        Биты  HAEN, ODR, INTPOL обнуляю всегда!"""
-        val = (bank << 7) | (mirror << 6) | (seqop << 5) | (disslw << 4)
-        if not self._bank and bank:		# переход из 0 -> 1 (плоская адресация -> раздельная адресация)
-            self._write_reg(0x0A, value=val)
-            # self._write_reg(0x0A, value=(val << 8) | val, bytes_count=2)
-            # self._write_reg(0x0B, value=val)
-        if not bank and self._bank:		# переход из 1 -> 0 (раздельная адресация -> плоская адресация)
-            self._write_reg(0x05, value=val)
-            # self._write_reg(0x15, value=val)
+        Изменяется только бит BANK, остальные биты (MIRROR, SEQOP, ODR, INTPOL и т.д., смотри setup_interrupt)
+        сохраняют значения. IOCON записывается, только если адресация меняется"""
+        if bank != self._bank:     # 0 -> 1 (плоская -> раздельная адресация) или 1 -> 0
+            iocon = self._get_iocon()
+            self._write_iocon((iocon | 0x80) if bank else (iocon & ~0x80))
         self._bank = bank
 
-    def _setup_interrupt(self):
-        pass
+    def _write_iocon(self, value: int):
+        """Записывает значение в регистр IOCON по его адресу при текущей адресации (IOCON.BANK).
+        IOCON общий для обоих портов, поэтому обновляются обе его копии в теневой копии.
+        Запись IOCON не объединяется с другими записями пакета адаптера (смотри I2cAdapter.batch)"""
+        value |= self._haen
+        self.adapter.flush()
+        self._write_reg(0x05 if self._bank else 0x0A, value=value)
+        self.adapter.flush()
+        self._bank = bool(value & 0x80)
+        self._shadow[10] = self._shadow[11] = value & 0xFE     # бит 0 IOCON всегда читается, как 0
+        self._valid |= 0x03 << 10
+
+    def _get_iocon(self) -> int:
+        """Возвращает значение IOCON из теневой копии. Если оно недостоверно, то читает его с шины"""
+        if not 0x01 & (self._valid >> 10):
+            self._shadow[10] = self._shadow[11] = self._read_reg(0x05 if self._bank else 0x0A)[0]
+            self._valid |= 0x03 << 10
+        return self._shadow[10]
+
+    def _set_seqop(self, value: bool):
+        """Устанавливает бит IOCON.SEQOP. Истина - последовательный режим выключен (адрес не увеличивается)"""
+        iocon = self._get_iocon()
+        val = (iocon | 0x20) if value else (iocon & ~0x20)
+        if val != iocon:
+            self._write_iocon(val)
+
+    # ПРЕРЫВАНИЯ
+    def setup_interrupt(self, enable: int, compare: int = 0, def_val: int = 0, mirror: bool = False,
+                        open_drain: bool = False, active_high: bool = False):
+        """Настраивает прерывание при изменении для текущего активного порта (в режиме 16 бит - для обоих портов).
+        enable - маска выводов, изменение уровня на которых вызывает прерывание (GPINTEN).
+        compare - маска выводов, уровень на которых сравнивается со значением def_val (INTCON, DEFVAL). Для остальных
+        выводов прерывание вызывает любое изменение уровня.
+        mirror - если Истина, то выходы INTA и INTB объединяются (IOCON.MIRROR).
+        open_drain - выходы прерывания с открытым стоком, активный уровень низкий (IOCON.ODR).
+        active_high - активный уровень выходов прерывания высокий (IOCON.INTPOL). Не действует, если open_drain."""
+        self.set_def_val(def_val)
+        self.set_int_ctrl(compare)
+        iocon = self._get_iocon()
+        val = (iocon & ~0x46) | (mirror << 6) | (open_drain << 2) | (active_high << 1)
+        if val != iocon:
+            self._write_iocon(val)
+        self.set_int_en(enable)
+        self.get_int_cap()      # сброс прерывания, возникшего до настройки
+
+    def attach_irq(self, pin, port: int = None):
+        """Подключает вывод MCU pin (machine.Pin, настроенный на ввод), соединенный с выходом INTA (port = 0),
+        INTB (port = 1) или с объединенным выходом (IOCON.MIRROR, port = None). По активному фронту выхода
+        прерывания вызывается service_interrupt(port). Вызывайте после setup_interrupt!"""
+        iocon = self._get_iocon()
+        trigger = pin.IRQ_RISING if 0x02 == iocon & 0x06 else pin.IRQ_FALLING   # ODR = 0, INTPOL = 1
+        pin.irq(handler=lambda _: self.service_interrupt(port), trigger=trigger)
+        self.service_interrupt(port)    # без этого уже активный выход прерывания не даст нового фронта
+
+    def service_interrupt(self, port: int = None):
+        """Читает одной транзакцией INTF и INTCAP (что сбрасывает прерывание) и помещает в очередь события
+        (port, changed_mask, captured_value) для каждого порта, в котором есть флаги прерывания.
+        port - 0 (порт A), 1 (порт B) или None (оба порта). При IOCON.BANK = 0 всегда читаются оба порта,
+        при IOCON.BANK = 1 оба порта читаются двумя транзакциями.
+        Не выделяет память в куче, поэтому может вызываться из обработчика прерывания."""
+        buf = self._irq_buf
+        if self._bank:
+            # INTF, INTCAP: 0x07, 0x08 (порт A) и 0x17, 0x18 (порт B). buf: INTFA, INTCAPA, INTFB, INTCAPB
+            if 1 != port:
+                self.adapter.read_buf_from_mem(self.address, 0x07, self._irq_halves[0])
+                if buf[0]:
+                    self._put_event(0, buf[0], buf[1])
+            if 0 != port:
+                self.adapter.read_buf_from_mem(self.address, 0x17, self._irq_halves[1])
+                if buf[2]:
+                    self._put_event(1, buf[2], buf[3])
+            return
+        # INTFA, INTFB, INTCAPA, INTCAPB: 0x0E..0x11
+        self.adapter.read_buf_from_mem(self.address, 0x0E, buf)
+        if buf[0]:
+            self._put_event(0, buf[0], buf[2])
+        if buf[1]:
+            self._put_event(1, buf[1], buf[3])
+
+    def _put_event(self, port: int, mask: int, captured: int):
+        """Помещает событие в очередь и вызывает обработчики событий (add_event_handler) и прерываний выводов
+        (set_pin_irq). Если очередь полна, событие теряется (смотри events_lost)"""
+        self._queue_event(port, mask, captured)
+        if self._ev_handlers is not None:
+            for handler in self._ev_handlers:
+                handler(port, mask, captured)
+        handlers = self._pin_irq
+        if handlers is None:
+            return
+        for bit in range(8):
+            if not (mask >> bit) & 1:
+                continue
+            entry = handlers[bit | (port << 3)]
+            if entry is None:
+                continue
+            arg, handler, trigger = entry
+            # trigger: 1 - спад (IRQ_FALLING), 2 - фронт (IRQ_RISING)
+            if trigger & (2 if (captured >> bit) & 1 else 1):
+                handler(arg)
+
+    def _queue_event(self, port: int, mask: int, captured: int):
+        """Помещает событие в очередь. Если очередь полна, событие теряется (смотри events_lost)"""
+        head = self._ev_head
+        nxt = head + 1
+        if nxt == len(self._ev_mask):
+            nxt = 0
+        if nxt == self._ev_tail:
+            self._ev_lost += 1
+            return
+        self._ev_port[head] = port
+        self._ev_mask[head] = mask
+        self._ev_cap[head] = captured
+        self._ev_head = nxt
+
+    def add_event_handler(self, handler):
+        """Добавляет обработчик событий прерывания handler(port, changed_mask, captured_value). Он вызывается для
+        каждого события, помещаемого в очередь (смотри service_interrupt), в том числе в контексте прерывания,
+        поэтому не должен выделять память в куче"""
+        if self._ev_handlers is None:
+            self._ev_handlers = list()
+        if handler not in self._ev_handlers:
+            self._ev_handlers.append(handler)
+
+    def remove_event_handler(self, handler):
+        """Удаляет обработчик событий прерывания, добавленный методом add_event_handler"""
+        handlers = self._ev_handlers
+        if handlers is not None and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                self._ev_handlers = None
+
+    def set_pin_irq(self, pin: int, handler=None, trigger: int = 3, arg=None):
+        """Вызывает handler(arg) при изменении уровня входа pin 0..15 (GPINTEN, INTCON = 0). trigger - 1 (спад),
+        2 (фронт) или 3 (оба). Уровень определяется по INTCAP, обработчик вызывается из service_interrupt.
+        Если handler равен None, то прерывание вывода выключается. Смотри ExpanderPin.irq"""
+        check_value(pin, range(16), f"Invalid pin value: {pin}!")
+        if self._pin_irq is None:
+            self._pin_irq = [None for _ in range(16)]
+        self._pin_irq[pin] = None if handler is None else (arg, handler, trigger)
+        mask = 1 << pin
+        if handler is not None:
+            self._update_pins(4, mask, 0)    # 4 - INTCON, прерывание при любом изменении
+        self._update_pins(2, mask, 0 if handler is None else mask)     # 2 - GPINTEN
+
+    def get_event(self) -> [tuple, None]:
+        """Извлекает из очереди самое старое событие прерывания (port, changed_mask, captured_value).
+        port - 0 (порт A) или 1 (порт B); changed_mask - значение INTF (выводы, вызвавшие прерывание);
+        captured_value - значение INTCAP (состояние порта в момент прерывания). Возвращает None, если очередь пуста"""
+        tail = self._ev_tail
+        if tail == self._ev_head:
+            return None
+        event = self._ev_port[tail], self._ev_mask[tail], self._ev_cap[tail]
+        tail += 1
+        self._ev_tail = 0 if tail == len(self._ev_mask) else tail
+        return event
+
+    def clear_events(self):
+        """Очищает очередь событий прерывания"""
+        self._ev_tail = self._ev_head
+
+    @property
+    def pending_events(self) -> int:
+        """Кол-во событий прерывания в очереди"""
+        return (self._ev_head - self._ev_tail) % len(self._ev_mask)
+
+    @property
+    def events_lost(self) -> int:
+        """Кол-во событий прерывания, потерянных из-за переполнения очереди"""
+        return self._ev_lost
 
     def _read_reg(self, reg_addr: int, bytes_count: int = 1) -> bytes:
         """Считывает значение из регистра по адресу регистра 0..0x10. Смотри _get_reg_address"""
         return self.adapter.read_register(self.address, reg_addr, bytes_count)
 
     def _write_reg(self, reg_addr: int, value: int, bytes_count: int = 1):
-        """Записывает в регистр с адресом reg_addr значение value по шине."""
+        """Записывает в регистр с адресом reg_addr значение value по шине.
+        При IOCON.SEQOP = 1 адрес не увеличивается, поэтому запись выполняется сразу, а не в пакете адаптера
+        (I2cAdapter.batch объединяет записи по смежным адресам)."""
         bo = self._get_byteorder_as_str()[0]
+        if self._shadow[10] & 0x20 and (self._valid >> 10) & 1:
+            if isinstance(value, int):
+                value = value.to_bytes(bytes_count, bo)
+            self.adapter.write_buf_to_mem(self.address, reg_addr, memoryview(value)[:bytes_count])
+            return
         self.adapter.write_register(self.address, reg_addr, value, bytes_count, bo)   # !!!
 
-    def _setup(self):
-        self.hex_mode = False
+    def _setup(self, hex_mode: bool = False):
+        self.hex_mode = hex_mode
 
     def __call__(self):
         """Чтение состояния линий портов Pх0..Pх7"""
@@ -298,3 +1026,124 @@ class MCP23017(Device, Iterator):
     def __next__(self) -> int:
         """Можно использовать как итератор (чтение в цикле for)"""
         return self.gpio
+
+    def changes(self, watch_mask: int = None, min_ms: int = 5, max_ms: int = 200, idle_polls: int = 4):
+        """Генератор. Опрашивает GPIO текущего активного порта (в режиме 16 бит - обоих портов) и возвращает
+        (new_value, changed_mask) только при изменении уровня выводов watch_mask (по умолчанию все выводы).
+        Значения и маски - в формате свойства gpio (в режиме 16 бит порт A - старший байт).
+        Период опроса адаптивный: после изменения - min_ms, а после idle_polls опросов без изменений он удваивается
+        с каждым опросом до max_ms. Поэтому в покое трафик шины в max_ms / min_ms раз меньше, чем при постоянном
+        опросе с периодом min_ms, а задержка реакции во время серии изменений - не больше min_ms.
+        Первое изменение после покоя обнаруживается с задержкой до max_ms."""
+        mask = (0xFFFF if self.hex_mode else 0xFF) if watch_mask is None else watch_mask
+        prev = self.gpio & mask
+        interval, quiet = min_ms, 0
+        while True:
+            time.sleep_ms(interval)
+            value = self.gpio
+            changed = (value ^ prev) & mask
+            if changed:
+                prev ^= changed
+                interval, quiet = min_ms, 0
+                yield value, changed
+                continue
+            quiet += 1
+            if quiet >= idle_polls:
+                interval = min(interval << 1, max_ms)
+
+
+class ExpanderArray(Iterator):
+    """Группа из 1..8 MCP23017 на одной шине, представленная одним портом шириной 16 * N бит (до 128 бит).
+    Бит 16 * i + n соответствует выводу n (0..15, порт A - младший байт) i-й микросхемы группы.
+    Все микросхемы переводятся в режим 16 бит (IOCON.BANK = 0), поэтому чтение или запись регистра одной микросхемы -
+    это одна транзакция. Запись в микросхемы, значение регистра которых не изменилось, пропускается.
+
+    Group of 1..8 MCP23017 on one bus, exposed as a single 16 * N bit wide port."""
+    def __init__(self, adapter: bus_service.I2cAdapter, addresses: [tuple, list] = None, bank: bool = None):
+        """adapter - адаптер шины I2C.
+        addresses - адреса микросхем на шине. Если None, то группа составляется из всех устройств, найденных на шине
+        по адресам 0x20..0x27. Если на этих адресах есть другие устройства, перечислите адреса явно!
+        bank - текущее значение IOCON.BANK всех микросхем, если оно известно (после POR - False). Смотри MCP23017"""
+        if addresses is None:
+            addresses = [addr for addr in adapter.bus.scan() if 0x20 <= addr <= 0x27]
+        self.chips = [MCP23017(adapter, addr, bank=bank, hex_mode=True) for addr in addresses]
+
+    def __len__(self) -> int:
+        return len(self.chips)
+
+    @property
+    def width(self) -> int:
+        """Разрядность группы (кол-во выводов)"""
+        return len(self.chips) << 4
+
+    def read_reg(self, index: int) -> int:
+        """Читает регистр с индексом index (смотри MCP23017._get_reg_address) всех микросхем группы.
+        Одна транзакция на микросхему"""
+        value = 0
+        for i, chip in enumerate(self.chips):
+            value |= chip._read_pins_reg(index) << (i << 4)
+        return value
+
+    def write_reg(self, index: int, value: int):
+        """Записывает value в регистр с индексом index всех микросхем группы. Одна транзакция на микросхему,
+        значение которой изменилось"""
+        for i, chip in enumerate(self.chips):
+            part = (value >> (i << 4)) & 0xFFFF
+            if 9 != index and part == chip._shadow_pins(index):
+                continue
+            chip._write_pins_reg(index, part)
+
+    def write_masked(self, mask: int, value: int):
+        """Записывает в OLAT биты value, выбранные маской mask. Остальные биты не изменяются.
+        Изменяются только микросхемы, на которые попадает маска"""
+        for i, chip in enumerate(self.chips):
+            shift = i << 4
+            m = (mask >> shift) & 0xFFFF
+            if not m:
+                continue
+            old = chip._shadow_pins(0x0A)
+            if old is None:
+                old = chip._read_pins_reg(0x0A)
+            new = old ^ ((old ^ (value >> shift)) & m)
+            if new != old:
+                chip._write_pins_reg(0x0A, new)
+
+    @property
+    def gpio(self) -> int:
+        """Состояние выводов всех микросхем группы"""
+        return self.read_reg(9)     # 9 - GPIO
+
+    @gpio.setter
+    def gpio(self, value: int):
+        self.write_reg(0x0A, value)     # 0x0A - OLAT
+
+    @property
+    def io_dir(self) -> int:
+        """Направление выводов всех микросхем группы (1 - ввод, 0 - вывод)"""
+        return self.read_reg(0)     # 0 - IODIR
+
+    @io_dir.setter
+    def io_dir(self, value: int):
+        self.write_reg(0, value)
+
+    @property
+    def pull_up(self) -> int:
+        """Подтягивающие резисторы всех микросхем группы"""
+        return self.read_reg(6)     # 6 - GPPU
+
+    @pull_up.setter
+    def pull_up(self, value: int):
+        self.write_reg(6, value)
+
+    @property
+    def input_polarity(self) -> int:
+        """Полярность выводов ввода всех микросхем группы"""
+        return self.read_reg(1)     # 1 - IPOL
+
+    @input_polarity.setter
+    def input_polarity(self, value: int):
+        self.write_reg(1, value)
+
+    def __next__(self) -> int:
+        """Можно использовать как итератор (чтение в цикле for)"""
+        return self.gpio
@@ -0,0 +1,85 @@
+# micropython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Выводы MCP23017, совместимые с machine.Pin.
+MCP23017 pins compatible with machine.Pin."""
+from mcp23017mod import MCP23017
+from sensor_pack.base_sensor import check_value
+
+
+class ExpanderPin:
+    """Вывод pin (0..15, порт A - выводы 0..7, порт B - выводы 8..15) расширителя портов с интерфейсом machine.Pin.
+    Все выводы используют теневую копию регистров расширителя, поэтому изменение вывода - не более одной транзакции
+    (байт его порта), а чтение уровня выхода, направления и подтяжки выполняется без обмена по шине, если
+    значение в теневой копии достоверно. Изменения многих выводов между expander.hold() и expander.commit()
+    записываются одной транзакцией.
+
+    Expander pin with machine.Pin interface. Pins share the expander register shadow; changes between
+    expander.hold() and expander.commit() are written in one transaction."""
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    def __init__(self, expander: MCP23017, pin: int, mode: int = -1, pull: int = -1, value: int = None):
+        """expander - расширитель портов.
+        pin - номер вывода 0..15.
+        mode, pull, value - смотри init."""
+        check_value(pin, range(16), f"Invalid pin value: {pin}!")
+        self.expander = expander
+        self.pin = pin
+        self._mask = 1 << pin
+        self.init(mode, pull, value)
+
+    def init(self, mode: int = -1, pull: int = -1, value: int = None):
+        """Настраивает вывод. mode - IN или OUT. pull - PULL_UP или None (MCP23017 не имеет подтяжки к общему
+        проводу). value - уровень выхода, записывается до перевода вывода в режим OUT.
+        Параметры, равные -1 (None для value), не изменяются."""
+        expander, mask = self.expander, self._mask
+        if pull not in (-1, None, ExpanderPin.PULL_UP):
+            raise ValueError(f"Invalid pull value: {pull}")
+        if mode not in (-1, ExpanderPin.IN, ExpanderPin.OUT):
+            raise ValueError(f"Invalid mode value: {mode}")
+        if value is not None:
+            self.value(value)
+        if -1 != mode:
+            expander._update_pins(0, mask, 0 if ExpanderPin.OUT == mode else mask)     # 0 - IODIR
+        if -1 != pull:
+            expander._update_pins(6, mask, mask if pull else 0)     # 6 - GPPU
+
+    def mode(self) -> int:
+        """Возвращает режим вывода IN или OUT"""
+        return ExpanderPin.IN if self.expander._read_bit(0, self.pin) else ExpanderPin.OUT
+
+    def value(self, x=None) -> [int, None]:
+        """Без параметра возвращает уровень вывода: для входа читается GPIO порта вывода (одна транзакция), для выхода
+        значение берется из OLAT теневой копии. С параметром x - записывает уровень выхода (OLAT)"""
+        expander = self.expander
+        if x is None:
+            if ExpanderPin.OUT == self.mode():
+                return expander._read_bit(0x0A, self.pin)   # 0x0A - OLAT
+            return expander._read_bit(9, self.pin)      # 9 - GPIO
+        expander._update_pins(0x0A, self._mask, self._mask if x else 0)
+
+    def __call__(self, x=None) -> [int, None]:
+        return self.value(x)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger: int = IRQ_FALLING | IRQ_RISING):
+        """Вызывает handler(pin) при изменении уровня входа (GPINTEN, INTCON = 0). trigger - IRQ_FALLING, IRQ_RISING
+        или оба. Уровень определяется по INTCAP, поэтому обработчик вызывается из expander.service_interrupt,
+        то есть в контексте прерывания, если выход прерывания подключен методом expander.attach_irq.
+        Если handler равен None, то прерывание вывода выключается."""
+        self.expander.set_pin_irq(self.pin, handler, trigger, self)
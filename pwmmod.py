@@ -0,0 +1,197 @@
+# micropython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Программная ШИМ на выходах MCP23017 (до 16 каналов).
+Software PWM on MCP23017 outputs (up to 16 channels)."""
+import array
+import micropython
+from mcp23017mod import MCP23017
+
+
+class SoftPWM:
+    """Программная ШИМ. Период разбит на интервалы (slot), длительность которых - время передачи по шине одного
+    состояния выводов (байт OLAT в режиме 8 бит, два байта в режиме 16 бит). Канал с заполнением до 50% включается
+    в начале периода и выключается в интервале, равном его заполнению. Канал с заполнением больше 50% выключается
+    в начале периода и включается так, чтобы оставаться включенным до конца периода. Поэтому все фронты лежат в первой
+    половине периода. Последовательность состояний выводов ШИМ (по одному на интервал, до последнего фронта)
+    вычисляется только при изменении заполнения (сортировкой фронтов). Остальные выводы OLAT берутся из теневой копии
+    перед каждым периодом, поэтому их изменения (set_pins и т.п.) сохраняются. Последовательность выводится одной
+    транзакцией stream_output в начале каждого периода. Последнее состояние сохраняется до конца периода без обмена
+    по шине, поэтому шина занята не больше половины периода и одного интервала (смотри busy) при любых заполнениях
+    каналов.
+    Если заполнение всех каналов 0 или 100%, то обмена по шине нет совсем.
+
+    Software PWM: the OLAT state sequence of one period is precomputed and streamed in one transaction.
+    Channels above 50% duty are right-aligned, so the bus is busy for at most half of the period."""
+    def __init__(self, expander: MCP23017, pins: int = 0xFFFF, period_ms: int = 10, slot_us: float = None,
+                 bus_freq: int = 400_000, exclusive: bool = False):
+        """expander - расширитель портов. В режиме 8 бит все выводы ШИМ должны быть на одном порте.
+        pins - маска выводов ШИМ (бит n - вывод n, порт A - младший байт). Выводы настраиваются на вывод.
+        period_ms - период ШИМ, мс.
+        slot_us - длительность передачи одного состояния выводов, мкс. Если None, то вычисляется по частоте шины
+        bus_freq (9 бит на байт I2C).
+        exclusive - IOCON.SEQOP = 1 все время работы (start..stop), тогда период - одна транзакция вместо трех.
+        В это время не обращайтесь к другим регистрам расширителя!"""
+        if expander._bank and pins > 0xFF and pins & 0xFF:
+            raise ValueError("In 8 bit mode all PWM pins must be on the same port!")
+        self.expander = expander
+        self.pins = pins
+        self.period_ms = period_ms
+        self.exclusive = exclusive
+        self._bps = 1 if expander._bank else 2  # байт на состояние
+        if slot_us is None:
+            slot_us = 9E6 * self._bps / bus_freq
+        self.steps = int(1000 * period_ms / slot_us)     # интервалов в периоде
+        self._duty = array.array("H", [0 for _ in range(16)])   # заполнение каналов 0..65535
+        self._pat = bytearray(self._bps * (self.steps // 2 + 1))    # состояния только выводов ШИМ
+        self._buf = bytearray(len(self._pat))   # состояния всех выводов порта(ов) для stream_output
+        self._n = 0     # кол-во байт последовательности состояний
+        self._base = -1     # состояние остальных выводов OLAT, с которым вычислен _buf
+        self._dirty = True
+        self._static = False    # последовательность из одного состояния уже выведена
+        self._timer = None
+        self._pending = False
+        self._running = False
+        self._tick_ref = self._scheduled    # ссылка на метод для micropython.schedule без выделения памяти
+        expander._update_pins(0, pins, 0)   # IODIR, выводы ШИМ - выходы
+
+    def duty_u16(self, pin: int, value: int = None) -> [int, None]:
+        """Возвращает (value равно None) или устанавливает заполнение канала pin 0..65535"""
+        if not (self.pins >> pin) & 1:
+            raise ValueError(f"Pin {pin} is not a PWM pin!")
+        if value is None:
+            return self._duty[pin]
+        value = min(max(value, 0), 0xFFFF)
+        if value != self._duty[pin]:
+            self._duty[pin] = value
+            self._dirty = True
+
+    def _put(self, pos: int, state: int) -> int:
+        """Записывает состояние выводов state (в порядке выводов) в буфер по индексу pos. Возвращает следующий индекс"""
+        buf = self._pat
+        if 1 == self._bps:
+            buf[pos] = (state >> 8) if self.pins > 0xFF else state & 0xFF
+            return pos + 1
+        buf[pos] = state & 0xFF         # OLATA
+        buf[pos + 1] = state >> 8       # OLATB
+        return pos + 2
+
+    def _compile(self):
+        """Вычисляет последовательность состояний выводов одного периода"""
+        steps = self.steps
+        state = 0       # состояние в начале периода
+        # фронты: интервал, направление (бит 4, 1 - включение) и номер канала, по возрастанию интервала
+        edges = list()
+        for pin in range(16):
+            if not (self.pins >> pin) & 1:
+                continue
+            slots = (self._duty[pin] * steps + 0x8000) >> 16
+            if slots >= steps:
+                state |= 1 << pin   # 100%
+            elif 2 * slots > steps:     # включен в конце периода
+                edges.append(((steps - slots) << 5) | 0x10 | pin)
+            elif slots:                 # включен в начале периода
+                edges.append((slots << 5) | pin)
+                state |= 1 << pin
+        edges.sort()
+        pos = t = 0
+        for edge in edges:
+            slots = edge >> 5
+            while t < slots:
+                pos = self._put(pos, state)
+                t += 1
+            if edge & 0x10:
+                state |= 1 << (edge & 0x0F)
+            else:
+                state &= ~(1 << (edge & 0x0F))
+        self._n = self._put(pos, state)     # состояние до конца периода
+        self._dirty = False
+        self._static = False
+        self._base = -1
+
+    def busy(self) -> float:
+        """Возвращает долю периода, в течение которой шина занята выводом ШИМ (не больше 0.5 + 1 / steps)"""
+        if self._dirty:
+            self._compile()
+        if self._n == self._bps:
+            return 0.0
+        return self._n / (self._bps * self.steps)
+
+    def _merge(self, base: int):
+        """Объединяет состояния выводов ШИМ с состоянием base остальных выводов OLAT (в порядке выводов)"""
+        pat, buf, n = self._pat, self._buf, self._n
+        if 1 == self._bps:
+            value = (base >> 8) if self.pins > 0xFF else base & 0xFF
+            for i in range(n):
+                buf[i] = pat[i] | value
+        else:
+            lo, hi = base & 0xFF, base >> 8
+            for i in range(0, n, 2):
+                buf[i] = pat[i] | lo
+                buf[i + 1] = pat[i + 1] | hi
+        self._base = base
+
+    def tick(self):
+        """Выводит один период ШИМ. Вызывайте с периодом period_ms (смотри start, run)"""
+        expander = self.expander
+        if self._dirty:
+            self._compile()
+        olat = expander._shadow_pins(0x0A)
+        if olat is None:
+            olat = expander._read_pins_reg(0x0A)
+        base = olat & ~self.pins
+        if base != self._base:
+            self._merge(base)
+        if self._static:
+            return
+        port = expander.active_port
+        if 1 == self._bps:
+            expander.active_port = 1 if self.pins > 0xFF else 0
+        try:
+            expander.stream_output(memoryview(self._buf)[:self._n], len(self._buf))
+        finally:
+            expander.active_port = port
+        self._static = self._n == self._bps
+
+    def _scheduled(self, _):
+        self._pending = False
+        self.tick()
+
+    def _on_timer(self, timer):
+        """Обработчик прерывания таймера. Обмен по шине выполняется вне прерывания (micropython.schedule)"""
+        if not self._pending:
+            self._pending = True
+            micropython.schedule(self._tick_ref, None)
+
+    def _begin(self):
+        self._running = True
+        if self.exclusive:
+            self.expander._set_seqop(True)
+
+    def start(self, timer_id: int = -1):
+        """Запускает ШИМ от таймера machine.Timer(timer_id) с периодом period_ms"""
+        from machine import Timer
+        self._begin()
+        self._timer = Timer(timer_id)
+        self._timer.init(mode=Timer.PERIODIC, period=self.period_ms, callback=self._on_timer)
+
+    async def run(self):
+        """Сопрограмма asyncio. Выводит периоды ШИМ под блокировкой шины (adapter.lock), пока не вызван stop"""
+        try:
+            import asyncio
+        except ImportError:
+            import uasyncio as asyncio
+        self._begin()
+        while self._running:
+            async with self.expander.adapter.lock:
+                self.tick()
+            await asyncio.sleep(self.period_ms / 1000)
+
+    def stop(self):
+        """Останавливает ШИМ. Выходы сохраняют последнее состояние периода"""
+        self._running = False
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        if self.exclusive:
+            self.expander._set_seqop(False)
@@ -7,27 +7,43 @@ Copyright (c) 2022 Roman Shevchik
 Well suited for averaging physical quantities read from sensors (temperature, pressure, humidity)."""
 import array
 
+_INT_CODES = "b", "B", "h", "H", "i", "I", "l", "L", "q", "Q"
+_FLOAT_CODES = "f", "d"
+
+
+def _check_type_code(type_code: str) -> bool:
+    """Проверяет код типа элементов массива. Возвращает Истина для чисел с плавающей точкой"""
+    if type_code not in _INT_CODES and type_code not in _FLOAT_CODES:
+        raise ValueError(f"Invalid type_code value: {type_code}")
+    return type_code in _FLOAT_CODES
+
 
 class Averager:
     """класс для усреднения значений, поступающих методом put. спроектирован для MCU, с их ограниченными ресурсами.
-    class for averaging the values coming from the put method. designed for the MCU, with their limited resources."""
+    Сумма значений окна обновляется при каждом вызове put, поэтому затраты не зависят от items_count.
+    class for averaging the values coming from the put method. designed for the MCU, with their limited resources.
+    The window sum is updated on every put, so the cost does not depend on items_count."""
     def __init__(self, items_count: int = 8, type_code: str = "b"):
         """items_count - количество значений, среднее арифметическое которых станет основой (после накопления)
         для расчета усредненного значения в дальнейшем.
+        type_code - код типа значений (array). Для "f" и "d" среднее вычисляется с дробной частью.
         sum_count - the number of values whose arithmetic mean will become the basis (after accumulation) for
         calculating the average value in the future"""
-        if type_code not in ("b", "B", "h", "H", "i", "I", "l", "L", "q", "Q"):     # , "f", "d"):
-            raise ValueError(f"Invalid type_code value: {type_code}")
+        self._float = _check_type_code(type_code)
         self._max = items_count
         self._index = 0
         self._cnt = 0
+        self._sum = 0
         self.arr = array.array(type_code, [0 for _ in range(items_count)])
 
-    def put(self, value: int) -> int:
+    def put(self, value: [int, float]) -> [int, float]:
         """Возвращает среднее арифметическое, основанное на сумме накопленных элементов.
         Returns the arithmetic mean based on the sum of the accumulated elements."""
-        self.arr[self._index] = value
-        if self._index < self._max - 1:
+        index = self._index
+        old = self.arr[index]
+        self.arr[index] = value
+        self._sum += self.arr[index] - old     # значение, как оно хранится в массиве (важно для "f")
+        if index < self._max - 1:
             self._index += 1
         else:
             self._index = 0
@@ -35,4 +51,99 @@ class Averager:
         if self._cnt < self._max:
             self._cnt += 1
 
-        return sum(self.arr) // self._cnt
+        if self._float:
+            return self._sum / self._cnt
+        return self._sum // self._cnt
+
+
+class ExpAverager:
+    """Экспоненциальное скользящее среднее: y = y + alpha * (x - y).
+    Для целых значений alpha = 1 / 2 ** shift, вычисления в фиксированной точке, без чисел с плавающей точкой.
+    Exponential moving average. For integers alpha = 1 / 2 ** shift, fixed-point math."""
+    def __init__(self, shift: int = 3, alpha: float = None):
+        """shift - вес нового значения 1 / 2 ** shift (целочисленный режим).
+        alpha - вес нового значения 0..1. Если задан, то вычисления с плавающей точкой, а shift не используется."""
+        if alpha is not None and not 0 < alpha <= 1:
+            raise ValueError(f"Invalid alpha value: {alpha}")
+        self._shift = shift
+        self._alpha = alpha
+        self._acc = None    # в целочисленном режиме - значение, умноженное на 2 ** shift
+
+    def put(self, value: [int, float]) -> [int, float]:
+        """Возвращает сглаженное значение. Первое значение принимается за начальное"""
+        if self._alpha is not None:
+            self._acc = value if self._acc is None else self._acc + self._alpha * (value - self._acc)
+            return self._acc
+        if self._acc is None:
+            self._acc = value << self._shift
+        else:
+            self._acc += value - (self._acc >> self._shift)
+        return self._acc >> self._shift
+
+
+class MedianFilter:
+    """Медиана последних items_count значений. Подавляет одиночные выбросы. Значения окна хранятся в упорядоченном
+    массиве, который обновляется при каждом вызове put вставкой (O(items_count), без выделения памяти).
+    Median of the last items_count values."""
+    def __init__(self, items_count: int = 5, type_code: str = "h"):
+        _check_type_code(type_code)
+        self._max = items_count
+        self._index = 0
+        self._cnt = 0
+        self.arr = array.array(type_code, [0 for _ in range(items_count)])         # окно в порядке поступления
+        self._sorted = array.array(type_code, [0 for _ in range(items_count)])     # окно по возрастанию
+
+    def put(self, value: [int, float]) -> [int, float]:
+        """Возвращает медиану накопленных значений (для четного кол-ва - меньшую из двух средних)"""
+        srt, cnt = self._sorted, self._cnt
+        if cnt < self._max:
+            i = cnt
+            self._cnt = cnt = cnt + 1
+        else:   # удаление самого старого значения из упорядоченного окна
+            i = 0
+            old = self.arr[self._index]
+            while srt[i] != old:
+                i += 1
+        # i - свободное место. Сдвиг к нему элементов, чтобы вставить value по порядку
+        while i > 0 and srt[i - 1] > value:
+            srt[i] = srt[i - 1]
+            i -= 1
+        while i < cnt - 1 and srt[i + 1] < value:
+            srt[i] = srt[i + 1]
+            i += 1
+        srt[i] = value
+        self.arr[self._index] = value
+        self._index = 0 if self._index == self._max - 1 else self._index + 1
+        return srt[(cnt - 1) >> 1]
+
+
+class MultiAverager:
+    """Скользящее среднее для channels каналов (например, 16 счетчиков импульсов выводов расширителя) в одном
+    массиве. Суммы окон обновляются при каждом вызове put, затраты не зависят от items_count.
+    Moving average of several channels stored in one array."""
+    def __init__(self, channels: int = 16, items_count: int = 8, type_code: str = "l"):
+        self._float = _check_type_code(type_code)
+        self._channels = channels
+        self._max = items_count
+        self._index = 0
+        self._cnt = 0
+        self.arr = array.array(type_code, [0 for _ in range(channels * items_count)])    # окна каналов подряд
+        self._sum = array.array("d" if self._float else "q", [0 for _ in range(channels)])
+        self.mean = array.array(type_code, [0 for _ in range(channels)])    # средние значения каналов
+
+    def put(self, values) -> array.array:
+        """Добавляет значения values всех каналов (последовательность из channels элементов).
+        Возвращает массив средних значений каналов (mean)"""
+        arr, sums, mean = self.arr, self._sum, self.mean
+        if self._cnt < self._max:
+            self._cnt += 1
+        cnt = self._cnt
+        pos = self._index
+        for ch in range(self._channels):
+            old = arr[pos]
+            arr[pos] = values[ch]
+            sums[ch] += arr[pos] - old
+            mean[ch] = sums[ch] / cnt if self._float else sums[ch] // cnt
+            pos += self._max
+        self._index = 0 if self._index == self._max - 1 else self._index + 1
+        return mean
@@ -4,7 +4,6 @@
 import micropython
 import ustruct
 from sensor_pack import bus_service
-from machine import SPI
 
 
 @micropython.native
@@ -17,7 +16,7 @@ def check_value(value: int, valid_range, error_msg: str) -> int:
 class Device:
     """Base device class"""
 
-    def __init__(self, adapter: bus_service.BusAdapter, address: [int, SPI], big_byte_order: bool):
+    def __init__(self, adapter: bus_service.BusAdapter, address: [int, "SPI"], big_byte_order: bool):
         """Базовый класс Устройство.
         Если big_byte_order равен True -> порядок байтов в регистрах устройства «big»
         (Порядок от старшего к младшему), в противном случае порядок байтов в регистрах "little"
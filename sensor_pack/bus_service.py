@@ -1,69 +1,226 @@
 # micropython
 # MIT license
 # Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
-"""MicroPython модуль для работы с шинами ввода/вывода"""
-
-from machine import I2C, SPI, Pin
+"""MicroPython модуль для работы с шинами ввода/вывода.
+Типы шин и выводов (machine.I2C, SPI, Pin) указаны в аннотациях строками, поэтому модуль machine не импортируется"""
 
 
 class BusAdapter:
     """Посредник между шиной ввода/вывода и классом ввода/вывода устройства"""
-    def __init__(self, bus: [I2C, SPI]):
+    def __init__(self, bus: ["I2C", "SPI"]):
         self.bus = bus
+        self._lock = None
+        # размер части (байт) пакетных методов fill.., write_chunked.., read_chunked.. по умолчанию
+        self.chunk_size = 32
+        self._fill_buf = None   # буфер адаптера для fill.., создается при первом обращении
+        self._int_bufs = dict()     # буферы write_register для целых значений по кол-ву байт
 
     def get_bus_type(self) -> type:
         """Возвращает тип шины"""
         return type(self.bus)
 
-    def read_register(self, device_addr: [int, Pin], reg_addr: int, bytes_count: int) -> bytes:
+    @property
+    def lock(self):
+        """Блокировка asyncio шины. Сопрограммы, работающие с устройствами на одной шине, выполняют обмен под этой
+        блокировкой и получают шину по очереди. Создается при первом обращении, поэтому синхронный код asyncio
+        не загружает."""
+        if self._lock is None:
+            try:
+                import asyncio
+            except ImportError:
+                import uasyncio as asyncio
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def read_register(self, device_addr: [int, "Pin"], reg_addr: int, bytes_count: int) -> bytes:
         """считывает из регистра датчика значение.
         device_addr - адрес датчика на шине. Для шины SPI это физический вывод MCU!
         reg_addr - адрес регистра в адресном пространстве датчика.
         bytes_count - размер значения в байтах."""
         raise NotImplementedError
 
-    def write_register(self, device_addr: [int, Pin], reg_addr: int, value: [int, bytes, bytearray],
+    def write_register(self, device_addr: [int, "Pin"], reg_addr: int, value: [int, bytes, bytearray],
                        bytes_count: int, byte_order: str):
         """записывает данные value в датчик, по адресу reg_addr.
         bytes_count - кол-во записываемых байт из value.
         byte_order - порядок расположения байт в записываемом значении."""
         raise NotImplementedError
 
-    def read(self, device_addr: [int, Pin], n_bytes: int) -> bytes:
+    def read_buf_from_mem(self, device_addr: [int, "Pin"], mem_addr, buf):
+        """Читает из устройства с адресом device_addr в буфер buf, начиная с адреса в устройстве mem_addr.
+        Количество считываемых байт определяется длинной буфера buf."""
         raise NotImplementedError
 
-    def write(self, device_addr: [int, Pin], buf: bytes):
+    def write_buf_to_mem(self, device_addr: [int, "Pin"], mem_addr, buf):
+        """Записывает в устройство с адресом device_addr все байты из буфера buf.
+        Запись начинается с адреса в устройстве: mem_addr."""
         raise NotImplementedError
 
-    def write_const(self, device_addr: [int, Pin], val: int, count: int):
-        """Отправляет пакет байт со значение val количеством count на шину.
-        Часто, при работе с дисплеями или памятью, требуется заполнение экрана/области
-        постоянным значением. Для этого и предназначен этот метод!
-        Вызов его для сравнительно медленных шин - плохая идея!"""
-        if 0 == count:
-            return  # нет ничего
+    def read(self, device_addr: [int, "Pin"], n_bytes: int) -> bytes:
+        raise NotImplementedError
+
+    def readinto(self, device_addr: [int, "Pin"], buf):
+        """Читает из устройства в буфер buf. Количество считываемых байт определяется длинной буфера buf."""
+        raise NotImplementedError
+
+    def write(self, device_addr: [int, "Pin"], buf: bytes):
+        raise NotImplementedError
+
+    def _int_buf(self, value: int, bytes_count: int, byte_order: str) -> bytearray:
+        """Возвращает байты целого value в буфере адаптера (один буфер на каждое кол-во байт). Не выделяет память в
+        куче, кроме первого обращения. Содержимое буфера действительно до следующего вызова!"""
+        buf = self._int_bufs.get(bytes_count)
+        if buf is None:
+            buf = self._int_bufs[bytes_count] = bytearray(bytes_count)
+        big = "big" == byte_order
+        for i in range(bytes_count):
+            buf[bytes_count - 1 - i if big else i] = value & 0xFF
+            value >>= 8
+        return buf
+
+    # ПАКЕТНЫЕ МЕТОДЫ. Передают count байт (длину буфера) частями по chunk байт (по умолчанию chunk_size) без
+    # выделения памяти в куче: используются буфер вызывающего (memoryview его частей) или буфер адаптера.
+    # Для ..._mem методов increment - адрес в устройстве увеличивается на размер части (память, регистры при
+    # последовательной адресации) или не изменяется (регистр-поток, например OLAT MCP23017 при IOCON.SEQOP = 1).
+    # buf - буфер байт: bytes, bytearray, memoryview байт, array.array("B").
+    def _get_fill_buf(self, val: int, chunk: int) -> memoryview:
+        """Возвращает часть буфера адаптера длиной chunk, заполненную значением val"""
         bl = val.bit_length()
         if bl > 8:
             raise ValueError(f"The value must take no more than 8 bits! Current: {bl}")
-        _max = 16
-        if count < _max:
-            _max = count
-        # вычисляю кол-во повторений тела цикла
-        repeats = count // _max  # количество итераций
-        b = bytearray([val for _ in range(_max)])
-        for _ in range(repeats):
-            self.write(device_addr, b)
-        # вычисляю остаток
-        remainder = count - _max * repeats
-        if remainder:
-            b = bytearray([val for _ in range(remainder)])
-            self.write(device_addr, b)
+        buf = self._fill_buf
+        if buf is None or len(buf) < chunk:
+            buf = self._fill_buf = bytearray(chunk)
+        for i in range(chunk):
+            buf[i] = val
+        return memoryview(buf)[:chunk]
+
+    def fill(self, device_addr: [int, "Pin"], val: int, count: int, chunk: int = None):
+        """Отправляет на шину count байт со значением val частями по chunk байт"""
+        self.fill_mem(device_addr, None, val, count, chunk)
+
+    def fill_mem(self, device_addr: [int, "Pin"], mem_addr: [int, None], val: int, count: int, chunk: int = None,
+                 increment: bool = True):
+        """Записывает в устройство count байт со значением val, начиная с адреса mem_addr, частями по chunk байт.
+        Если mem_addr равен None, то байты передаются методом write (без адреса в устройстве)"""
+        if count <= 0:
+            return  # нет ничего
+        chunk = min(count, chunk or self.chunk_size)
+        buf = self._get_fill_buf(val, chunk)
+        while count > 0:
+            part = buf if count >= chunk else buf[:count]
+            if mem_addr is None:
+                self.write(device_addr, part)
+            else:
+                self.write_buf_to_mem(device_addr, mem_addr, part)
+                if increment:
+                    mem_addr += len(part)
+            count -= len(part)
+
+    def write_chunked(self, device_addr: [int, "Pin"], buf, chunk: int = None):
+        """Отправляет на шину все байты буфера buf частями по chunk байт"""
+        self.write_mem_chunked(device_addr, None, buf, chunk)
+
+    def write_mem_chunked(self, device_addr: [int, "Pin"], mem_addr: [int, None], buf, chunk: int = None,
+                       increment: bool = True):
+        """Записывает в устройство все байты буфера buf, начиная с адреса mem_addr, частями по chunk байт.
+        Если mem_addr равен None, то байты передаются методом write"""
+        mv = memoryview(buf)
+        n = len(mv)
+        if not n:
+            return  # нет ничего
+        chunk = chunk or self.chunk_size
+        for start in range(0, n, chunk):
+            part = mv[start:start + chunk]
+            if mem_addr is None:
+                self.write(device_addr, part)
+            else:
+                self.write_buf_to_mem(device_addr, mem_addr + start if increment else mem_addr, part)
+
+    def read_chunked(self, device_addr: [int, "Pin"], buf, chunk: int = None):
+        """Читает с шины байты в буфер buf (например, memoryview части большого буфера) частями по chunk байт"""
+        self.read_mem_chunked(device_addr, None, buf, chunk)
+
+    def read_mem_chunked(self, device_addr: [int, "Pin"], mem_addr: [int, None], buf, chunk: int = None,
+                      increment: bool = True):
+        """Читает из устройства байты в буфер buf, начиная с адреса mem_addr, частями по chunk байт.
+        Если mem_addr равен None, то байты читаются методом readinto"""
+        mv = memoryview(buf)
+        n = len(mv)
+        if not n:
+            return  # нет ничего
+        chunk = chunk or self.chunk_size
+        for start in range(0, n, chunk):
+            part = mv[start:start + chunk]
+            if mem_addr is None:
+                self.readinto(device_addr, part)
+            else:
+                self.read_buf_from_mem(device_addr, mem_addr + start if increment else mem_addr, part)
+
+    def flush(self, target: "BusAdapter" = None):
+        """Записывает отложенные записи в регистры, если адаптер их откладывает (смотри I2cAdapter.batch).
+        Драйвер вызывает его перед записью, меняющей адресацию регистров устройства.
+        target - адаптер, методом write_buf_to_mem которого передаются записи (по умолчанию этот адаптер).
+        StatAdapter передает себя, чтобы учесть транзакции пакета."""
+        pass
+
+    def write_const(self, device_addr: [int, "Pin"], val: int, count: int):
+        """Отправляет пакет байт со значение val количеством count на шину.
+        Часто, при работе с дисплеями или памятью, требуется заполнение экрана/области
+        постоянным значением. Для этого и предназначен этот метод!
+        Вызов его для сравнительно медленных шин - плохая идея!
+        Смотри fill."""
+        self.fill(device_addr, val, count)
+
+
+class WriteBatch:
+    """Контекстный менеджер пакета записей адаптера. Смотри I2cAdapter.batch"""
+    def __init__(self, adapter: BusAdapter):
+        self.adapter = adapter
+
+    def __enter__(self):
+        self.adapter._batch_depth += 1
+        return self.adapter
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.adapter._batch_depth -= 1
+        if not self.adapter._batch_depth:
+            self.adapter.flush()
 
 
 class I2cAdapter(BusAdapter):
     """"""
-    def __init__(self, bus: I2C):
+    def __init__(self, bus: "I2C"):
         super().__init__(bus)
+        self._batch_depth = 0
+        # отложенные записи в регистры пакета: (device_addr << 8) | reg_addr -> байт
+        self._pending = dict()
+
+    def batch(self) -> WriteBatch:
+        """Пакет записей в регистры: with adapter.batch(): ...
+        Внутри пакета write_register не выполняет обмен, а запоминает байты. Повторная запись по тому же адресу
+        заменяет предыдущую. При выходе из пакета (или перед любым чтением, write, write_buf_to_mem) записи
+        сортируются по адресам и смежные адреса устройства записываются одной транзакцией.
+        Устройство должно увеличивать адрес регистра при последовательной записи (у MCP23017 IOCON.SEQOP = 0).
+        Порядок записи в регистры внутри пакета не сохраняется! Пакеты могут быть вложенными."""
+        return WriteBatch(self)
+
+    def flush(self, target: BusAdapter = None):
+        """Записывает накопленные в пакете записи. Смежные адреса регистров устройства записываются одной
+        транзакцией методом write_buf_to_mem адаптера target (по умолчанию этого адаптера)"""
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = dict()
+        write = (self if target is None else target).write_buf_to_mem
+        keys = sorted(pending)
+        start = 0
+        for i in range(1, 1 + len(keys)):
+            if i < len(keys) and keys[i] == 1 + keys[i - 1] and keys[i] >> 8 == keys[start] >> 8:
+                continue
+            key = keys[start]
+            write(key >> 8, key & 0xFF, bytes(pending[k] for k in keys[start:i]))
+            start = i
 
     def write_register(self, device_addr: int, reg_addr: int, value: [int, bytes, bytearray],
                        bytes_count: int, byte_order: str):
@@ -72,39 +229,70 @@ class I2cAdapter(BusAdapter):
         value - должно быть типов int, bytes, bytearray"""
         buf = None
         if isinstance(value, int):
-            buf = value.to_bytes(bytes_count, byte_order)
+            buf = self._int_buf(value, bytes_count, byte_order)
         if isinstance(value, (bytes, bytearray)):
             buf = value
 
+        if self._batch_depth:
+            key = (device_addr << 8) | reg_addr
+            for b in buf:
+                self._pending[key] = b
+                key += 1
+            return None
         return self.bus.writeto_mem(device_addr, reg_addr, buf)
 
     def read_register(self, device_addr: int, reg_addr: int, bytes_count: int) -> bytes:
         """считывает из регистра датчика значение.
         bytes_count - размер значения в байтах"""
+        if self._pending:
+            self.flush()
         return self.bus.readfrom_mem(device_addr, reg_addr, bytes_count)
 
     def read(self, device_addr: int, n_bytes: int) -> bytes:
+        if self._pending:
+            self.flush()
         return self.bus.readfrom(device_addr, n_bytes)
+
+    def readinto(self, device_addr: int, buf):
+        """Читает из устройства в буфер buf. Количество считываемых байт определяется длинной буфера buf."""
+        if self._pending:
+            self.flush()
+        return self.bus.readfrom_into(device_addr, buf)
     
     def read_buf_from_mem(self, device_addr: int, mem_addr, buf):
         """Читает из устройства с адресом device_addr в буфер buf, начиная с адреса в устройстве mem_addr.
         Количество считываемых байт определяется длинной буфера buf."""
+        if self._pending:
+            self.flush()
         return self.bus.readfrom_mem_into(device_addr, mem_addr, buf)
 
     def write(self, device_addr: int, buf: bytes):
+        if self._pending:
+            self.flush()
         return self.bus.writeto(device_addr, buf)
 
     def write_buf_to_mem(self, device_addr: int, mem_addr, buf):
         """Записывает в устройство с адресом device_addr все байты из буфера buf.
-        Запись начинается с адреса в устройстве: mem_addr."""
+        Запись начинается с адреса в устройстве: mem_addr. Не откладывается пакетом записей."""
+        if self._pending:
+            self.flush()
         return self.bus.writeto_mem(device_addr, mem_addr, buf)
 
 
 class SpiAdapter(BusAdapter):
     """Параметр data_mode представляет собой вывод MCU, который используется для установки флага, что посылка является
-    данными (high) или командой (low). Например это необходимо при обмене ILI9481."""
-    def __init__(self, bus: SPI, data_mode: Pin = None):
+    данными (high) или командой (low). Например это необходимо при обмене ILI9481.
+    Параметр cs - вывод MCU выбора устройств (chip select) для доступа к регистрам (read_register, write_register,
+    read_buf_from_mem, write_buf_to_mem). Посылка доступа к регистрам, как у MCP23S17: код операции
+    (device_addr << 1) | R/W, адрес регистра, данные. device_addr - 7-ми битный адрес устройства (для MCP23S17:
+    0x20 | A2A1A0), поэтому устройства с разными адресами могут использовать общий вывод cs."""
+    def __init__(self, bus: "SPI", data_mode: "Pin" = None, cs: "Pin" = None):
         super().__init__(bus)
+        self.cs = cs
+        # IOCON.HAEN MCP23S17 на выводе cs уже установлен (смотри MCP23017._enable_haen)
+        self.haen = False
+        # заголовок посылки доступа к регистрам: код операции, адрес регистра
+        self._header = bytearray(2)
         # вывод MCU для режима данных
         self.data_mode_pin = data_mode
         # использовать ли вывод MCU для режима данных (Истина) или команд (Ложь)
@@ -113,14 +301,48 @@ class SpiAdapter(BusAdapter):
         # flag for write.. methods. If True, then data_mode (Pin) will be set to True, otherwise to False!
         self.data_packet = False
 
-    def read_register(self, device_addr: Pin, reg_addr: int, bytes_count: int) -> bytes:
-        raise NotImplementedError
+    def _start_mem(self, device_addr: int, mem_addr: int, read: bool):
+        """Выбирает устройства (cs) и передает заголовок посылки доступа к регистрам"""
+        header = self._header
+        header[0] = ((device_addr << 1) | read) & 0xFF
+        header[1] = mem_addr
+        self.cs.low()
+        self.bus.write(header)
 
-    def write_register(self, device_addr: Pin, reg_addr: int, value: [int, bytes, bytearray],
+    def read_register(self, device_addr: int, reg_addr: int, bytes_count: int) -> bytes:
+        """считывает из регистра устройства с адресом device_addr значение.
+        bytes_count - размер значения в байтах"""
+        buf = bytearray(bytes_count)
+        self.read_buf_from_mem(device_addr, reg_addr, buf)
+        return bytes(buf)
+
+    def write_register(self, device_addr: int, reg_addr: int, value: [int, bytes, bytearray],
                        bytes_count: int, byte_order: str):
-        raise NotImplementedError
+        """записывает данные value в устройство с адресом device_addr, по адресу reg_addr.
+        bytes_count - кол-во записываемых данных
+        value - должно быть типов int, bytes, bytearray"""
+        buf = self._int_buf(value, bytes_count, byte_order) if isinstance(value, int) else value
+        return self.write_buf_to_mem(device_addr, reg_addr, buf)
+
+    def read_buf_from_mem(self, device_addr: int, mem_addr, buf):
+        """Читает из устройства с адресом device_addr в буфер buf, начиная с адреса в устройстве mem_addr.
+        Количество считываемых байт определяется длинной буфера buf. Не выделяет память в куче."""
+        try:
+            self._start_mem(device_addr, mem_addr, True)
+            return self.bus.readinto(buf, 0x00)
+        finally:
+            self.cs.high()
+
+    def write_buf_to_mem(self, device_addr: int, mem_addr, buf):
+        """Записывает в устройство с адресом device_addr все байты из буфера buf.
+        Запись начинается с адреса в устройстве: mem_addr. Не выделяет память в куче."""
+        try:
+            self._start_mem(device_addr, mem_addr, False)
+            return self.bus.write(buf)
+        finally:
+            self.cs.high()
 
-    def read(self, device_addr: Pin, n_bytes: int) -> bytes:
+    def read(self, device_addr: "Pin", n_bytes: int) -> bytes:
         """Read a number of bytes specified by n_bytes while continuously writing the single byte given by write.
         Returns a bytes object with the data that was read."""
         try:
@@ -129,7 +351,7 @@ class SpiAdapter(BusAdapter):
         finally:
             device_addr.high()
 
-    def readinto(self, device_addr: Pin, buf):
+    def readinto(self, device_addr: "Pin", buf):
         """Read into the buffer specified by buf while continuously writing the single byte given by write.
         Returns None."""
         try:
@@ -138,7 +360,7 @@ class SpiAdapter(BusAdapter):
         finally:
             device_addr.high()
 
-    def write(self, device_addr: Pin, buf: bytes):
+    def write(self, device_addr: "Pin", buf: bytes):
         """Параметр data_packet представляет собой признак того, что посылка является данными (high) или командой (low).
         Например это необходимо при обмене ILI9481.
         Write the bytes contained in buf. Returns None.
@@ -152,7 +374,7 @@ class SpiAdapter(BusAdapter):
         finally:
             device_addr.high()
 
-    def write_and_read(self, device_addr: Pin, wr_buf: bytes, rd_buf: bytes):
+    def write_and_read(self, device_addr: "Pin", wr_buf: bytes, rd_buf: bytes):
         """Параметр data_packet представляет собой признак того, что посылка является данными (high) или командой (low).
         Например это необходимо при обмене ILI9481.
         Write the bytes from write_buf while reading into read_buf. The buffers can be the same or different,
@@ -0,0 +1,188 @@
+# micropython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Учет обмена по шине: кол-во транзакций, байт и гистограмма их длительности для каждого устройства и регистра.
+Bus transaction statistics: transaction count, bytes and latency histogram per device and register."""
+import array
+import time
+from sensor_pack.bus_service import BusAdapter, WriteBatch
+
+
+class BusStat:
+    """Счетчики обмена. Для каждого устройства (до devices штук) и регистра (0..regs-1) - кол-во транзакций и байт.
+    Обмен без адреса регистра (read, write) и с адресом регистра >= regs учитывается в последней строке (regs).
+    Для каждого устройства - гистограмма длительности транзакций: в интервале i - транзакции длительностью
+    от 2 ** (i - 1) до 2 ** i мкс (последний интервал - все более длинные).
+    Все счетчики создаются в конструкторе, при учете память в куче не выделяется."""
+    def __init__(self, devices: int = 8, regs: int = 32, bins: int = 16):
+        self._regs = regs + 1
+        self._bins = bins
+        self._addrs = [None for _ in range(devices)]
+        self.count = array.array("L", [0 for _ in range(devices * self._regs)])
+        self.bytes = array.array("L", [0 for _ in range(devices * self._regs)])
+        self.hist = array.array("L", [0 for _ in range(devices * bins)])
+        self.dropped = 0    # кол-во транзакций устройств, для которых не хватило места
+
+    def _slot(self, device_addr) -> int:
+        """Возвращает номер строки устройства в счетчиках или -1, если места нет"""
+        addrs = self._addrs
+        for i in range(len(addrs)):
+            if addrs[i] is None:
+                addrs[i] = device_addr
+                return i
+            if addrs[i] == device_addr:
+                return i
+        return -1
+
+    def record(self, device_addr, reg_addr: [int, None], n_bytes: int, elapsed_us: int):
+        """Учитывает одну транзакцию"""
+        slot = self._slot(device_addr)
+        if slot < 0:
+            self.dropped += 1
+            return
+        if reg_addr is None or reg_addr >= self._regs - 1:
+            reg_addr = self._regs - 1
+        i = slot * self._regs + reg_addr
+        self.count[i] += 1
+        self.bytes[i] += n_bytes
+        b = elapsed_us.bit_length() if elapsed_us > 0 else 0
+        if b >= self._bins:
+            b = self._bins - 1
+        self.hist[slot * self._bins + b] += 1
+
+    def reset(self):
+        """Обнуляет все счетчики"""
+        for arr in self.count, self.bytes, self.hist:
+            for i in range(len(arr)):
+                arr[i] = 0
+        for i in range(len(self._addrs)):
+            self._addrs[i] = None
+        self.dropped = 0
+
+    def items(self):
+        """Генератор. Возвращает (адрес устройства, адрес регистра, кол-во транзакций, кол-во байт) для всех
+        ненулевых счетчиков. Для обмена без адреса регистра адрес регистра равен None"""
+        for slot, addr in enumerate(self._addrs):
+            if addr is None:
+                break
+            for reg in range(self._regs):
+                i = slot * self._regs + reg
+                if self.count[i]:
+                    yield addr, None if reg == self._regs - 1 else reg, self.count[i], self.bytes[i]
+
+    def histogram(self, device_addr) -> [memoryview, None]:
+        """Возвращает гистограмму длительности транзакций устройства или None, если обмена с ним не было"""
+        if device_addr not in self._addrs:
+            return None
+        slot = self._addrs.index(device_addr)
+        return memoryview(self.hist)[slot * self._bins:(slot + 1) * self._bins]
+
+    def dump(self):
+        """Выводит счетчики в консоль"""
+        for addr, reg, count, n_bytes in self.items():
+            reg = "-" if reg is None else f"0x{reg:02X}"
+            print(f"device: {addr}; reg: {reg}; transactions: {count}; bytes: {n_bytes}")
+        for addr in self._addrs:
+            if addr is not None:
+                print(f"device: {addr}; latency histogram, log2(us): {list(self.histogram(addr))}")
+        if self.dropped:
+            print(f"dropped: {self.dropped}")
+
+
+class StatAdapter(BusAdapter):
+    """Посредник между драйвером устройства и адаптером шины, учитывающий каждую транзакцию в BusStat.
+    Передайте его в драйвер вместо адаптера, например MCP23017(StatAdapter(adapter)), или присвойте атрибуту
+    adapter драйвера. Учет выключается возвратом исходного адаптера и тогда ничего не стоит."""
+    def __init__(self, adapter: BusAdapter, stat: BusStat = None):
+        super().__init__(adapter.bus)
+        self.adapter = adapter
+        self.stat = BusStat() if stat is None else stat
+
+    def __getattr__(self, name):
+        """Остальные атрибуты и методы берутся у исходного адаптера"""
+        return getattr(self.adapter, name)
+
+    @property
+    def lock(self):
+        return self.adapter.lock
+
+    def batch(self) -> WriteBatch:
+        """Пакет записей исходного адаптера (смотри I2cAdapter.batch). Отложенные записи не учитываются, а
+        учитываются транзакции, которыми они передаются (flush)"""
+        self.adapter.batch()    # исходный адаптер должен поддерживать пакеты
+        return WriteBatch(self)
+
+    @property
+    def _batch_depth(self) -> int:
+        return self.adapter._batch_depth
+
+    @_batch_depth.setter
+    def _batch_depth(self, value: int):
+        self.adapter._batch_depth = value
+
+    @property
+    def haen(self) -> bool:
+        return self.adapter.haen
+
+    @haen.setter
+    def haen(self, value: bool):
+        self.adapter.haen = value
+
+    def flush(self, target: BusAdapter = None):
+        return self.adapter.flush(self if target is None else target)
+
+    def _flush_pending(self):
+        """Передает отложенные записи пакета через этот адаптер (иначе исходный адаптер передаст их сам, без учета)"""
+        if getattr(self.adapter, "_pending", None):
+            self.flush()
+
+    def read_register(self, device_addr, reg_addr: int, bytes_count: int) -> bytes:
+        self._flush_pending()
+        t = time.ticks_us()
+        res = self.adapter.read_register(device_addr, reg_addr, bytes_count)
+        self.stat.record(device_addr, reg_addr, bytes_count, time.ticks_diff(time.ticks_us(), t))
+        return res
+
+    def write_register(self, device_addr, reg_addr: int, value: [int, bytes, bytearray],
+                       bytes_count: int, byte_order: str):
+        if getattr(self.adapter, "_batch_depth", 0):    # запись отложена до flush
+            return self.adapter.write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+        t = time.ticks_us()
+        res = self.adapter.write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+        self.stat.record(device_addr, reg_addr, bytes_count, time.ticks_diff(time.ticks_us(), t))
+        return res
+
+    def read_buf_from_mem(self, device_addr, mem_addr, buf):
+        self._flush_pending()
+        t = time.ticks_us()
+        res = self.adapter.read_buf_from_mem(device_addr, mem_addr, buf)
+        self.stat.record(device_addr, mem_addr, len(buf), time.ticks_diff(time.ticks_us(), t))
+        return res
+
+    def write_buf_to_mem(self, device_addr, mem_addr, buf):
+        self._flush_pending()
+        t = time.ticks_us()
+        res = self.adapter.write_buf_to_mem(device_addr, mem_addr, buf)
+        self.stat.record(device_addr, mem_addr, len(buf), time.ticks_diff(time.ticks_us(), t))
+        return res
+
+    def read(self, device_addr, n_bytes: int) -> bytes:
+        self._flush_pending()
+        t = time.ticks_us()
+        res = self.adapter.read(device_addr, n_bytes)
+        self.stat.record(device_addr, None, n_bytes, time.ticks_diff(time.ticks_us(), t))
+        return res
+
+    def readinto(self, device_addr, buf):
+        self._flush_pending()
+        t = time.ticks_us()
+        res = self.adapter.readinto(device_addr, buf)
+        self.stat.record(device_addr, None, len(buf), time.ticks_diff(time.ticks_us(), t))
+        return res
+
+    def write(self, device_addr, buf: bytes):
+        self._flush_pending()
+        t = time.ticks_us()
+        res = self.adapter.write(device_addr, buf)
+        self.stat.record(device_addr, None, len(buf), time.ticks_diff(time.ticks_us(), t))
+        return res
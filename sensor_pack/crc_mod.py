@@ -14,17 +14,96 @@ Copyright (c) 2022 Roman Shevchik
     Входная последовательность: 0x01 0x02 0x03
     CRC-8: 0x87
     Входная последовательность: 0 1 2 3 4 5 6 7 8 9
-    CRC-8: 0x52"""
-
-
-def crc8(sequence, polynomial: int, init_value: int = 0x00):
-    mask = 0xFF
-    crc = init_value & mask
-    for item in sequence:
-        crc ^= item & mask
-        for _ in range(8):
-            if crc & 0x80:
-                crc = mask & ((crc << 1) ^ polynomial)
-            else:
-                crc = mask & (crc << 1)
+    CRC-8: 0x52
+
+ Вычисление табличное: таблица из 256 байт создается один раз для каждого полинома.
+ Для bytes, bytearray, memoryview и array.array байты читаются функцией viper без копирования (если в прошивке
+ есть генератор машинного кода, иначе - функцией на Python).
+ Table-driven: a 256-byte table is built once per polynomial. Buffers are processed by a viper function when
+ the native emitter is available."""
+import array
+
+# таблицы CRC-8 по полиному
+_tables = dict()
+
+
+def crc8_table(polynomial: int) -> bytes:
+    """Возвращает таблицу CRC-8 (256 байт) для полинома polynomial. Таблица вычисляется при первом обращении"""
+    table = _tables.get(polynomial)
+    if table is None:
+        tmp = bytearray(256)
+        for i in range(256):
+            crc = i
+            for _ in range(8):
+                crc = 0xFF & ((crc << 1) ^ polynomial) if crc & 0x80 else 0xFF & (crc << 1)
+            tmp[i] = crc
+        table = _tables[polynomial] = bytes(tmp)
+    return table
+
+
+def _update_buf(crc: int, data, count: int, table) -> int:
+    """Обновляет crc count байтами буфера data (bytes, bytearray, memoryview, array.array).
+    Байтовые буферы читаются без копирования. Копия (bytes) создается, только если элементы буфера больше
+    одного байта (например, array.array("H")): иначе индекс - номер элемента, а не байта"""
+    buf = bytes(data) if getattr(data, "itemsize", 1) > 1 else data
+    for i in range(count):
+        crc = table[crc ^ (buf[i] & 0xFF)]  # & 0xFF - для элементов со знаком ("b")
     return crc
+
+
+# функция viper в отдельном модуле: прошивка без генератора машинного кода не может скомпилировать декоратор
+# viper (SyntaxError при импорте модуля), тогда остается функция на Python
+try:
+    from sensor_pack.crc_native import update_buf as _update_buf
+except (ImportError, SyntaxError):
+    pass
+
+
+def _nbytes(buf) -> int:
+    """Возвращает размер буфера в байтах (для array.array и memoryview с элементами больше одного байта
+    len возвращает кол-во элементов)"""
+    if isinstance(buf, array.array):
+        return len(buf) * buf.itemsize
+    if isinstance(buf, memoryview) and hasattr(buf, "nbytes"):
+        return buf.nbytes
+    return len(buf)
+
+
+def _update(crc: int, sequence, table: bytes, count: int = None) -> int:
+    """Обновляет crc элементами последовательности sequence"""
+    if isinstance(sequence, (bytes, bytearray, memoryview, array.array)):
+        size = _nbytes(sequence)
+        if count is None:
+            count = size
+        elif count > size:
+            raise ValueError(f"Invalid count value: {count}")
+        return _update_buf(crc, sequence, count, table)
+    for item in sequence:   # последовательность целых чисел (list, tuple, генератор)
+        crc = table[crc ^ (item & 0xFF)]
+    return crc
+
+
+def crc8(sequence, polynomial: int, init_value: int = 0x00, count: int = None):
+    """Возвращает CRC-8 последовательности sequence. Для буферов - всех байт буфера (для array.array("H") - два
+    байта на элемент) или count первых байт"""
+    return _update(init_value & 0xFF, sequence, crc8_table(polynomial), count)
+
+
+class Crc8:
+    """Потоковое вычисление CRC-8: данные передаются частями методом update.
+    Incremental CRC-8: data is fed in chunks by the update method."""
+    def __init__(self, polynomial: int, init_value: int = 0x00):
+        self._table = crc8_table(polynomial)
+        self._init = init_value & 0xFF
+        self.value = self._init
+
+    def update(self, data, count: int = None) -> int:
+        """Обновляет CRC данными data и возвращает его значение.
+        count - кол-во первых байт буфера data. По умолчанию - все байты буфера (для array.array с элементами
+        больше одного байта - размер в байтах, а не кол-во элементов)"""
+        self.value = _update(self.value, data, self._table, count)
+        return self.value
+
+    def reset(self):
+        """Возвращает CRC к начальному значению"""
+        self.value = self._init
@@ -0,0 +1,17 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Табличное вычисление CRC-8 буфера функцией viper (смотри crc_mod). Импортируется, только если в прошивке есть
+генератор машинного кода.
+Viper CRC-8 buffer update, imported by crc_mod only when the native emitter is available."""
+import micropython
+
+
+@micropython.viper
+def update_buf(crc: int, data, count: int, table) -> int:
+    """Обновляет crc count байтами буфера data (bytes, bytearray, memoryview, array.array)"""
+    buf = ptr8(data)
+    tbl = ptr8(table)
+    for i in range(count):
+        crc = tbl[(crc ^ buf[i]) & 0xFF]
+    return crc
@@ -0,0 +1,92 @@
+"""
+MIT License
+Copyright (c) 2023 Roman Shevchik
+
+Подавитель дребезга контактов/Debouncer.
+Обрабатывает все биты слова (например, 16 выводов расширителя портов) одновременно, вертикальными счетчиками:
+бит j счетчиков всех выводов хранится в одном целом числе. Затраты на одну выборку - O(1) целочисленных операций
+(пропорционально разрядности счетчика), независимо от количества выводов.
+Processes all bits of a word (for example, 16 I/O expander pins) at once using vertical counters."""
+
+
+class Debouncer:
+    """Подавитель дребезга на вертикальных счетчиках. Бит состояния изменяется, когда соответствующий бит
+    выборки отличается от него samples выборок подряд. Порог samples задается для каждого вывода.
+    Vertical counter debouncer. A state bit changes after the input bit differs from it for samples samples in a row."""
+    def __init__(self, samples: int = 4, width: int = 16, max_samples: int = None, initial: int = 0,
+                 active_low: bool = False, source=None):
+        """samples - порог (кол-во одинаковых выборок подряд) для всех выводов.
+        width - разрядность (кол-во выводов).
+        max_samples - наибольший порог, который может быть задан методом set_samples. Определяет разрядность
+        счетчиков. Если None, то равен samples.
+        initial - начальное состояние.
+        active_low - если Истина, то нажатием (pressed) считается переход 1 -> 0 (кнопка на общий провод с
+        подтягивающим резистором), иначе 0 -> 1.
+        source - итерируемый источник выборок (например, MCP23017). Если задан, то объект можно использовать,
+        как итератор: for state in Debouncer(source=expander)."""
+        if max_samples is None:
+            max_samples = samples
+        if not 1 <= samples <= max_samples:
+            raise ValueError(f"Invalid samples value: {samples}")
+        self._mask = (1 << width) - 1
+        self._bits = max_samples.bit_length()
+        self._cnt = [0 for _ in range(self._bits)]      # вертикальный счетчик
+        self._thr = [0 for _ in range(self._bits)]      # вертикальный порог
+        self._max = max_samples
+        self._state = initial & self._mask
+        self.active_low = active_low
+        self.source = source
+        self.changed = 0
+        self.pressed = 0
+        self.released = 0
+        self.set_samples(self._mask, samples)
+
+    def set_samples(self, mask: int, samples: int):
+        """Задает порог samples для выводов, выбранных маской mask"""
+        if not 1 <= samples <= self._max:
+            raise ValueError(f"Invalid samples value: {samples}")
+        mask &= self._mask
+        for j in range(self._bits):
+            if (samples >> j) & 1:
+                self._thr[j] |= mask
+            else:
+                self._thr[j] &= ~mask
+        for j in range(self._bits):     # счет начинается заново
+            self._cnt[j] &= ~mask
+
+    @property
+    def state(self) -> int:
+        """Текущее состояние без дребезга"""
+        return self._state
+
+    def update(self, sample: int) -> int:
+        """Обрабатывает выборку sample и возвращает состояние без дребезга.
+        В атрибутах changed, pressed, released - маски выводов, состояние которых изменилось при этой выборке"""
+        cnt, thr = self._cnt, self._thr
+        delta = (sample ^ self._state) & self._mask
+        # инкремент счетчиков выводов, отличающихся от состояния, и сброс остальных
+        carry = delta
+        for j in range(self._bits):
+            c = cnt[j]
+            cnt[j] = (c ^ carry) & delta
+            carry &= c
+        # выводы, счетчик которых достиг порога
+        eq = delta
+        for j in range(self._bits):
+            eq &= ~(cnt[j] ^ thr[j])
+        if eq:
+            for j in range(self._bits):
+                cnt[j] &= ~eq
+            self._state ^= eq
+        rising = eq & self._state
+        falling = eq & ~self._state
+        self.changed = eq
+        self.pressed, self.released = (falling, rising) if self.active_low else (rising, falling)
+        return self._state
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        """Читает выборку из source и возвращает состояние без дребезга"""
+        return self.update(next(self.source))
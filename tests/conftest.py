@@ -0,0 +1,52 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Общие настройки тестов: каталог host (заменители machine, micropython, ustruct) должен быть в sys.path раньше
+остальных, затем корень репозитория. Запуск: python -m pytest -q
+Test setup: the host directory (machine, micropython, ustruct stand-ins) goes first on sys.path."""
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in _ROOT, os.path.join(_ROOT, "host"):
+    if _path in sys.path:
+        sys.path.remove(_path)
+    sys.path.insert(0, _path)
+
+import micropython  # noqa: E402 (добавляет в time функции ticks_*, sleep_ms, sleep_us)
+import pytest       # noqa: E402
+from machine import I2C     # noqa: E402
+from mcp23017sim import MCP23017Sim     # noqa: E402
+from sensor_pack.bus_service import I2cAdapter  # noqa: E402
+import mcp23017mod  # noqa: E402
+
+ADDRESS = 0x27
+
+
+@pytest.fixture
+def i2c():
+    return I2C(1)
+
+
+@pytest.fixture
+def chip(i2c):
+    return MCP23017Sim(i2c, ADDRESS)
+
+
+@pytest.fixture
+def adapter(i2c, chip):
+    return I2cAdapter(i2c)
+
+
+@pytest.fixture
+def new_expander(adapter):
+    """Фабрика расширителей с известным образом регистров после POR (конструктор без обмена по шине)"""
+    def make(hex_mode: bool = True, **kwargs) -> mcp23017mod.MCP23017:
+        return mcp23017mod.MCP23017(adapter, ADDRESS, image=mcp23017mod.POR_IMAGE, hex_mode=hex_mode, **kwargs)
+    return make
+
+
+@pytest.fixture(params=[True, False], ids=["bank0", "bank1"])
+def expander(request, new_expander):
+    """Расширитель в режиме 16 бит (IOCON.BANK = 0) и в режиме 8 бит (IOCON.BANK = 1)"""
+    return new_expander(hex_mode=request.param)
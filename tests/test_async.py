@@ -0,0 +1,36 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Асинхронный интерфейс MCP23017Async на модели микросхемы.
+MCP23017Async checks against the register model."""
+import asyncio
+from mcp23017async import MCP23017Async
+
+
+def test_port_restored(chip, new_expander):
+    e = new_expander(hex_mode=False)
+    e.io_dir = 0x00
+    e.active_port = 1
+    e.io_dir = 0x0F
+    chip.drive(0x0500)
+    a = MCP23017Async(e)
+
+    async def run():
+        await a.write_gpio(0x3C, port=0)
+        return await a.read_gpio()
+
+    assert 0x05 == asyncio.run(run())
+    assert 1 == e.active_port
+    assert 0x3C == chip.outputs() & 0xFF
+
+
+def test_async_iterator(chip, new_expander):
+    e = new_expander()
+    chip.drive(0x1234)
+    a = MCP23017Async(e, period_ms=1)
+
+    async def first():
+        async for value in a:
+            return value
+
+    assert 0x3412 == asyncio.run(first())
@@ -0,0 +1,37 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Фильтры sensor_pack.averager.
+Filter checks."""
+import pytest
+from sensor_pack.averager import Averager, ExpAverager, MedianFilter, MultiAverager
+
+
+def test_averager():
+    avg = Averager(4, "h")
+    assert [10, 15, 20, 25, 35] == [avg.put(v) for v in (10, 20, 30, 40, 50)]
+    avg = Averager(2, "f")
+    avg.put(1)
+    assert 1.5 == avg.put(2)
+
+
+def test_exp_averager():
+    avg = ExpAverager(shift=1)
+    assert [100, 50, 25] == [avg.put(v) for v in (100, 0, 0)]
+    avg = ExpAverager(alpha=0.5)
+    assert [100, 50.0] == [avg.put(v) for v in (100, 0)]
+    with pytest.raises(ValueError):
+        ExpAverager(alpha=0)
+
+
+def test_median_filter():
+    flt = MedianFilter(3)
+    assert [5, 5, 6, 7, 7] == [flt.put(v) for v in (5, 100, 6, 7, 8)]
+
+
+def test_multi_averager():
+    avg = MultiAverager(channels=2, items_count=2)
+    avg.put((10, 100))
+    mean = avg.put((20, 300))
+    assert [15, 200] == list(mean)
+    assert [25, 250] == list(avg.put((30, 200)))
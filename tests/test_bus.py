@@ -0,0 +1,125 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Адаптеры шин (sensor_pack.bus_service) с моделью MCP23017 и MCP23S17.
+Bus adapter checks against the MCP23017/MCP23S17 model."""
+import pytest
+from machine import SPI, Pin
+from mcp23017sim import MCP23017Sim, IODIR, GPPU
+from sensor_pack.bus_service import SpiAdapter
+from sensor_pack.bus_stat import StatAdapter
+import mcp23017mod
+from conftest import ADDRESS
+
+
+def chip_pins(chip, index: int) -> int:
+    """Значение регистра обоих портов модели в порядке выводов"""
+    return chip.read_reg(index, 0) | (chip.read_reg(index, 1) << 8)
+
+
+# пакет записей
+def test_batch_coalesces_writes(i2c, chip, new_expander, adapter):
+    e = new_expander()
+    n = i2c.transactions
+    with adapter.batch():
+        e.io_dir = 0x0000
+        e.input_polarity = 0x0000
+        e.int_en = 0x0101
+        e.pull_up = 0xFFFF
+    assert 2 == i2c.transactions - n    # 0x00..0x05 и 0x0C..0x0D
+    assert 0 == chip_pins(chip, IODIR) and 0xFFFF == chip_pins(chip, GPPU)
+
+
+def test_batch_flushes_before_read(new_expander, adapter):
+    e = new_expander()
+    with adapter.batch():
+        e.io_dir = 0x00FF
+        assert 0x00FF == e.io_dir
+
+
+def test_batch_with_seqop_set(chip, new_expander, adapter):
+    e = new_expander()
+    e._set_seqop(True)
+    with adapter.batch():
+        e.io_dir = 0x0000
+        e.pull_up = 0x0F0F
+    assert 0 == chip_pins(chip, IODIR) and 0x0F0F == chip_pins(chip, GPPU)
+
+
+# MCP23S17
+def test_spi_shared_cs():
+    """MCP23S17 с общим CS различаются аппаратным адресом (IOCON.HAEN)"""
+    spi = SPI(1, baudrate=10_000_000)
+    cs = Pin(5, Pin.OUT, value=1)
+    addresses = 0x20, 0x21, 0x27
+    chips = [MCP23017Sim(None, addr) for addr in addresses]
+    for sim in chips:
+        sim.spi_attach(spi, cs)
+    adapter = SpiAdapter(spi, cs=cs)
+    expanders = [mcp23017mod.MCP23017(adapter, addr, bank=False, hex_mode=True) for addr in addresses]
+    for i, e in enumerate(expanders):
+        e.io_dir = 0
+        e.gpio = 0x1111 * (i + 1)
+    assert [0x1111, 0x2222, 0x3333] == [sim.outputs() for sim in chips]
+    assert all(0x08 == sim.iocon for sim in chips)
+    chips[2].drive(0xABCD)
+    expanders[2].io_dir = 0xFFFF
+    assert 0xCDAB == expanders[2].gpio
+
+
+def test_spi_bank1_snapshot():
+    spi = SPI(1)
+    cs = Pin(5, Pin.OUT, value=1)
+    chip = MCP23017Sim(None, 0x21)
+    chip.spi_attach(spi, cs)
+    e = mcp23017mod.MCP23017(SpiAdapter(spi, cs=cs), 0x21, bank=False, hex_mode=False)
+    e._update_pins(0, 0xFFFF, 0x00F0)
+    image = e.snapshot()
+    assert chip.bank and 0xF0 == image[0] and 0x00 == image[1]
+
+
+def test_spi_unknown_bank():
+    """Адрес IOCON для установки HAEN неизвестен: запись по адресу 0x0A при BANK = 1 изменила бы OLATA"""
+    spi = SPI(1)
+    cs = Pin(5, Pin.OUT, value=1)
+    chip = MCP23017Sim(None, 0x21)
+    chip.spi_attach(spi, cs)
+    chip.iocon = 0x80   # MCU перезапущен, микросхема осталась в режиме BANK = 1
+    chip.regs[0][IODIR] = 0
+    adapter = SpiAdapter(spi, cs=cs)
+    with pytest.raises(ValueError):
+        mcp23017mod.MCP23017(adapter, 0x21)
+    assert 0 == chip.outputs() and 0x80 == chip.iocon
+    mcp23017mod.MCP23017(adapter, 0x21, bank=True)
+    assert 0x88 == chip.iocon and adapter.haen
+    e = mcp23017mod.MCP23017(StatAdapter(adapter), 0x21)    # HAEN уже установлен: BANK определяется опросом
+    assert e._bank and not SpiAdapter(spi, cs=cs).haen
+
+
+# передача частями
+def test_fill_mem(i2c, chip, adapter):
+    adapter.fill_mem(ADDRESS, 0x0C, 0x5A, 4, chunk=2)   # GPPUA..INTFB
+    assert 2 == i2c.transactions
+    assert 0x5A == chip.regs[0][GPPU] == chip.regs[1][GPPU]
+
+
+def test_chunked_transfer(i2c, chip, adapter):
+    adapter.write_mem_chunked(ADDRESS, 0x00, bytes([1, 2, 3, 4, 5, 6]), chunk=4)
+    assert 2 == i2c.transactions
+    assert (1, 2, 3) == (chip.regs[0][IODIR], chip.regs[1][IODIR], chip.regs[0][1])
+    buf = bytearray(6)
+    i2c.reset_counters()
+    adapter.read_mem_chunked(ADDRESS, 0x00, memoryview(buf), chunk=2)
+    assert 3 == i2c.transactions
+    assert bytes([1, 2, 3, 4, 5, 6]) == buf
+
+
+def test_chunked_defaults(i2c, chip, adapter):
+    adapter.write_mem_chunked(ADDRESS, 0x14, b"")
+    adapter.read_mem_chunked(ADDRESS, 0x00, bytearray(0))
+    assert 0 == i2c.transactions
+    adapter.chunk_size = 4
+    buf = bytearray(10)
+    adapter.read_mem_chunked(ADDRESS, 0x00, buf)    # по умолчанию - части по chunk_size байт
+    assert 3 == i2c.transactions
+    assert 0xFF == buf[0] == buf[1]     # IODIRA, IODIRB после POR
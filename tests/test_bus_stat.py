@@ -0,0 +1,61 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Статистика транзакций шины (sensor_pack.bus_stat) на модели MCP23017.
+Bus transaction statistics checks."""
+import pytest
+from machine import SPI, Pin
+from sensor_pack.bus_service import I2cAdapter, SpiAdapter
+from sensor_pack.bus_stat import BusStat, StatAdapter
+import mcp23017mod
+from conftest import ADDRESS
+
+
+def _recorded(sa: StatAdapter) -> int:
+    return sum(item[2] for item in sa.stat.items())
+
+
+def test_counts(i2c, chip):
+    sa = StatAdapter(I2cAdapter(i2c))
+    e = mcp23017mod.MCP23017(sa, ADDRESS, image=mcp23017mod.POR_IMAGE, hex_mode=True)
+    e.gpio
+    e.gpio
+    e.set_pins(0x0100)
+    assert [(ADDRESS, 0x12, 2, 4), (ADDRESS, 0x14, 1, 2)] == list(sa.stat.items())
+    assert i2c.transactions == _recorded(sa)
+    assert 3 == sum(sa.stat.histogram(ADDRESS))
+    sa.stat.reset()
+    assert [] == list(sa.stat.items())
+
+
+def test_batch(i2c, chip):
+    """Транзакции пакета записей учитываются так, как они переданы по шине"""
+    sa = StatAdapter(I2cAdapter(i2c))
+    e = mcp23017mod.MCP23017(sa, ADDRESS, image=mcp23017mod.POR_IMAGE, hex_mode=True)
+    with sa.batch():
+        e.io_dir = 0
+        e.pull_up = 0xFF
+        e.input_polarity = 0
+        e.int_en = 0
+    assert 2 == i2c.transactions == _recorded(sa)
+    sa.stat.reset()
+    i2c.reset_counters()
+    with sa.batch():
+        e.io_dir = 0xFFFF
+        e.gpio
+        e.pull_up = 1
+    assert 3 == i2c.transactions == _recorded(sa)
+
+
+def test_batch_unsupported():
+    """StatAdapter поддерживает пакеты, только если их поддерживает исходный адаптер"""
+    sa = StatAdapter(SpiAdapter(SPI(1), cs=Pin(5, Pin.OUT, value=1)))
+    with pytest.raises(AttributeError):
+        sa.batch()
+
+
+def test_device_slots():
+    stat = BusStat(devices=1)
+    stat.record(0x20, 0x00, 1, 10)
+    stat.record(0x21, 0x00, 1, 10)
+    assert 1 == stat.dropped and stat.histogram(0x21) is None
@@ -0,0 +1,41 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""CRC-8 sensor_pack.crc_mod.
+CRC-8 checks."""
+import array
+import pytest
+from sensor_pack.crc_mod import crc8, Crc8
+
+
+def test_known_values():
+    assert 0x87 == crc8(b"\x01\x02\x03", 0x31, 0xFF)
+    assert 0x52 == crc8(bytes(range(10)), 0x31, 0xFF)
+    assert crc8(b"\x01\x02", 0x31, 0xFF) == crc8(b"\x01\x02\x03", 0x31, 0xFF, count=2)
+
+
+def test_typed_buffers():
+    """Типизированные буферы обрабатываются целиком, все байты каждого элемента"""
+    data = array.array("H", (0x0102, 0xA0B0, 0xFFFF))
+    raw = bytes(data)
+    assert crc8(raw, 0x31, 0xFF) == crc8(data, 0x31, 0xFF) == crc8(memoryview(data), 0x31, 0xFF)
+    assert crc8(raw, 0x31, 0xFF) == crc8(bytearray(raw), 0x31, 0xFF) == crc8(memoryview(raw), 0x31, 0xFF)
+    with pytest.raises(ValueError):
+        crc8(data, 0x31, 0xFF, count=len(raw) + 1)
+
+
+def test_byte_views():
+    """Байтовые буферы любого вида, в том числе со знаком и срезы memoryview"""
+    raw = bytes((0xFF, 0x02, 0x80, 0x7F))
+    ref = crc8(raw, 0x31, 0xFF)
+    assert ref == crc8(array.array("b", (-1, 2, -128, 127)), 0x31, 0xFF)
+    assert ref == crc8(memoryview(array.array("b", (-1, 2, -128, 127))), 0x31, 0xFF)
+    assert ref == crc8(memoryview(b"\x00" + raw)[1:], 0x31, 0xFF)
+
+
+def test_incremental():
+    crc = Crc8(0x31, 0xFF)
+    crc.update(b"\x00\x01\x02")
+    assert crc8(bytes(range(10)), 0x31, 0xFF) == crc.update(bytes(range(3, 10)))
+    crc.reset()
+    assert 0xFF == crc.value
@@ -0,0 +1,45 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Подавитель дребезга sensor_pack.debouncer.
+Debouncer checks."""
+import pytest
+from sensor_pack.debouncer import Debouncer
+
+
+def test_debouncer():
+    deb = Debouncer(samples=3, width=4)
+    for _ in range(2):
+        assert 0 == deb.update(0b0011)
+    assert 0b0011 == deb.update(0b0011) == deb.pressed == deb.changed
+    deb.update(0b0001)
+    deb.update(0b0011)     # дребезг: счет вывода 1 начинается заново
+    deb.update(0b0001)
+    deb.update(0b0001)
+    assert 0b0011 == deb.state
+    assert 0b0001 == deb.update(0b0001)
+    assert 0b0010 == deb.released
+
+
+def test_samples_per_pin():
+    deb = Debouncer(samples=1, width=2, max_samples=4, active_low=True, initial=0b11)
+    deb.set_samples(0b10, 4)
+    deb.update(0b00)
+    assert 0b10 == deb.state and 0b01 == deb.pressed
+    for _ in range(3):
+        deb.update(0b00)
+    assert 0 == deb.state and 0b10 == deb.pressed
+    with pytest.raises(ValueError):
+        deb.set_samples(0b01, 5)
+
+
+def test_source():
+    deb = Debouncer(samples=2, width=1, source=iter((1, 1, 0)))
+    assert [0, 1, 1] == list(deb)
+
+
+def test_expander_source(chip, new_expander):
+    chip.drive(0x00FF)
+    deb = Debouncer(samples=2, source=new_expander())
+    next(deb)
+    assert 0xFF00 == next(deb)
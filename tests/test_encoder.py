@@ -0,0 +1,48 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Счетчики импульсов и энкодеры encodermod.PulseCounter на модели микросхемы.
+PulseCounter checks against the register model."""
+import time
+from encodermod import PulseCounter, RISING
+
+
+def test_pulse_counter(chip, new_expander):
+    e = new_expander()
+    levels = [0xFFFF]
+    chip.drive(levels[0])
+    pc = PulseCounter(e, pulse_pins=0x0101, encoders=((2, 3), (9, 10)), edges=RISING)
+
+    def put(pin: int, value: int):
+        levels[0] = (levels[0] & ~(1 << pin)) | (value << pin)
+        chip.drive(levels[0])
+        e.service_interrupt()
+
+    for _ in range(5):
+        put(0, 0)
+        time.sleep_ms(1)
+        put(0, 1)
+    for _ in range(3):
+        put(8, 0)
+        put(8, 1)
+    assert (5, 3) == (pc.count(0), pc.count(8))
+    assert 0 < pc.frequency(0) < 1000
+    quadrature = (1, 0), (0, 0), (0, 1), (1, 1)     # A, B
+    for _ in range(2):
+        for a, b in quadrature:
+            put(2, a)
+            put(3, b)
+    assert 8 == pc.position(0) and pc.velocity(0) > 0
+    for a, b in reversed(((1, 1),) + quadrature[:-1]):
+        put(9, a)
+        put(10, b)
+    assert -4 == pc.position(1) and pc.velocity(1) < 0
+    assert 0 == pc.errors
+    levels[0] ^= 0x0600     # оба входа энкодера 1 в одном событии - пропущенный шаг
+    chip.drive(levels[0])
+    e.service_interrupt()
+    assert 1 == pc.errors
+    pc.reset()
+    assert 0 == pc.count(0) == pc.position(0)
+    pc.deinit()
+    assert 0 == chip.regs[0][2] == chip.regs[1][2]  # GPINTEN
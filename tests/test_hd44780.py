@@ -0,0 +1,34 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""ЖКИ hd44780mod.HD44780 на модели микросхемы.
+HD44780 driver checks against the register model."""
+import pytest
+from hd44780mod import HD44780
+
+
+@pytest.fixture
+def lcd(new_expander):
+    return HD44780(new_expander(), rs=0, e=1, data=(4, 5, 6, 7))
+
+
+def test_write_bounds(lcd):
+    size = len(lcd.frame)
+    lcd.write("x" * 40, 3, 15)
+    assert size == len(lcd.frame)
+    assert b"xxxxx" == lcd.frame[-5:]
+    for row, col in (4, 0), (-1, 0), (0, 20), (0, -1):
+        with pytest.raises(ValueError):
+            lcd.write("x", row, col)
+    assert size == len(lcd.frame)
+
+
+def test_show(i2c, lcd):
+    lcd.write("Hello, world!")
+    lcd.write("line 4", 3, 2)
+    i2c.reset_counters()
+    assert 17 == lcd.show()
+    assert 3 == i2c.transactions    # IOCON.SEQOP = 1, OLAT, IOCON.SEQOP = 0
+    lcd.write("Hellx")
+    assert 1 == lcd.show()
+    assert 0 == lcd.show()
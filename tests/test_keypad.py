@@ -0,0 +1,94 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Сканер матричной клавиатуры keypadmod.Keypad на модели микросхемы с клавиатурой.
+Keypad scanner checks against a keypad matrix model."""
+import pytest
+from machine import Pin
+from mcp23017sim import MCP23017Sim, IODIR, OLAT
+from sensor_pack.bus_service import I2cAdapter
+from keypadmod import Keypad
+import mcp23017mod
+from conftest import ADDRESS
+
+
+class MatrixSim(MCP23017Sim):
+    """Матричная клавиатура: клавиша (row, col) замыкает вывод row порта A с выводом col порта B.
+    Уровень вывода низкий, если он соединен нажатыми клавишами с выходом в нуле"""
+    keys = frozenset()
+
+    def _levels(self) -> int:
+        low = set()
+        for pin in range(16):
+            regs = self.regs[pin >> 3]
+            if not (regs[IODIR] >> (pin & 7)) & 1 and not (regs[OLAT] >> (pin & 7)) & 1:
+                low.add(pin)
+        links = {pin: set() for pin in range(16)}
+        for row, col in self.keys:
+            links[row].add(8 + col)
+            links[8 + col].add(row)
+        result = 0xFFFF
+        for pin in range(16):
+            seen, stack = {pin}, [pin]
+            while stack:
+                for other in links[stack.pop()] - seen:
+                    seen.add(other)
+                    stack.append(other)
+            if seen & low:
+                result &= ~(1 << pin)
+        return result
+
+    def _port_levels(self, port: int) -> int:
+        return (self._levels() >> (port << 3)) & 0xFF
+
+
+@pytest.fixture
+def matrix(i2c):
+    return MatrixSim(i2c, ADDRESS)
+
+
+@pytest.fixture
+def matrix_expander(i2c, matrix):
+    """Расширитель с моделью клавиатуры (фикстура chip не используется, она заняла бы адрес ADDRESS)"""
+    return mcp23017mod.MCP23017(I2cAdapter(i2c), ADDRESS, image=mcp23017mod.POR_IMAGE, hex_mode=True)
+
+
+def _scan(keypad: Keypad, chip: MatrixSim, keys, count: int = 3) -> int:
+    chip.keys = frozenset(keys)
+    for _ in range(count):
+        state = keypad.scan()
+    return state
+
+
+def test_keypad(matrix, matrix_expander):
+    kp = Keypad(matrix_expander, 8, 8, samples=2)
+    assert 0 == _scan(kp, matrix, ()) and 1 == kp.transactions
+    assert [19] == list(kp.keys(_scan(kp, matrix, [(2, 3)])))
+    assert 4 == kp.transactions     # одна строка: без опроса строк
+    assert [9, 38] == list(kp.keys(_scan(kp, matrix, [(1, 1), (4, 6)])))
+    assert 9 == kp.transactions
+    state = _scan(kp, matrix, [(1, 1), (1, 6), (4, 1)])    # фантомная клавиша (4, 6)
+    assert kp.ghost and [9, 38] == list(kp.keys(state))
+    assert 0 == _scan(kp, matrix, ())
+
+
+def test_keeps_other_pins(matrix, matrix_expander):
+    """Опрос изменяет направление только выводов клавиатуры"""
+    e = matrix_expander
+    e._update_pins(0, 0xF0F0, 0)    # выводы 4..7 и 12..15 - выходы
+    kp = Keypad(e, 4, 4, samples=1)
+    _scan(kp, matrix, [(1, 1), (2, 3)], 1)
+    assert 2 == bin(kp.debouncer.state).count("1")
+    assert (0x00, 0x0F) == (matrix.regs[0][IODIR], matrix.regs[1][IODIR])
+
+
+def test_wake_pin(matrix, matrix_expander):
+    wake = Pin(3, Pin.IN)
+    matrix.int_pins[1] = wake
+    kp = Keypad(matrix_expander, 4, 4, samples=2, wake_pin=wake)
+    assert 0 == _scan(kp, matrix, (), 2) and 0 == kp.transactions     # покой без обмена по шине
+    matrix.keys = frozenset([(0, 0)])
+    matrix._evaluate()
+    assert 1 == _scan(kp, matrix, [(0, 0)])
+    assert 0 == _scan(kp, matrix, (), 4)
+    assert 0 == _scan(kp, matrix, (), 1) and 0 == kp.transactions
@@ -0,0 +1,339 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Драйвер MCP23017 на модели микросхемы.
+MCP23017 driver checks against the register model."""
+import os
+import subprocess
+import sys
+import pytest
+from machine import Pin
+from sensor_pack.bus_service import I2cAdapter
+from mcp23017sim import MCP23017Sim, IODIR, GPPU, OLAT
+import mcp23017mod as m
+
+
+def chip_pins(chip, index: int) -> int:
+    """Значение регистра обоих портов модели в порядке выводов"""
+    return chip.read_reg(index, 0) | (chip.read_reg(index, 1) << 8)
+
+
+# теневая копия
+@pytest.mark.parametrize("hex_mode", [True, False])
+def test_hex_mode_switch(chip, new_expander, hex_mode):
+    e = new_expander(hex_mode=hex_mode)
+    assert chip.bank != hex_mode
+    e.hex_mode = not hex_mode
+    assert chip.bank == hex_mode
+
+
+def test_cache_serves_reads(i2c, new_expander):
+    e = new_expander(use_cache=True)
+    e.io_dir = 0x1234
+    n = i2c.transactions
+    assert 0x1234 == e.io_dir
+    assert n == i2c.transactions
+
+
+def test_shadow_coherent_across_hex_mode(chip, new_expander):
+    e = new_expander(hex_mode=True, use_cache=True)
+    e.io_dir = 0x12F0       # порт A - старший байт
+    e.hex_mode = False
+    e.active_port = 0
+    assert 0x12 == e.io_dir
+    e.active_port = 1
+    assert 0xF0 == e.io_dir
+    e.io_dir = 0x0F
+    e.hex_mode = True
+    assert 0x120F == e.io_dir == (chip.read_reg(IODIR, 0) << 8) | chip.read_reg(IODIR, 1)
+
+
+def test_invalidate_reads_chip(chip, new_expander):
+    e = new_expander(use_cache=True)
+    chip.regs[0][GPPU] = 0x55   # изменение мимо драйвера
+    assert 0 == e.pull_up >> 8
+    e.invalidate()
+    assert 0x55 == e.pull_up >> 8
+
+
+# отдельные выводы
+def test_write_masked(chip, new_expander):
+    e = new_expander()
+    e.io_dir = 0
+    e.set_pins(0x0300)
+    e.clear_pins(0x0100)
+    e.toggle_pins(0x0001)
+    assert 0x0102 == chip.outputs()    # в формате gpio порт A - старший байт, в модели - младший
+    e.write_masked(0xFF00, 0x5500)
+    assert 0x0155 == chip.outputs()
+
+
+def test_set_pins_single_transaction(i2c, new_expander):
+    e = new_expander()
+    e.io_dir = 0
+    n = i2c.transactions
+    e.set_pins(0x8001)
+    e.toggle_pins(0x8000)
+    assert 2 == i2c.transactions - n    # только запись OLAT, без чтения
+
+
+# образ регистров
+def test_snapshot_restore(chip, expander):
+    expander._update_pins(0, 0xFFFF, 0x0F0F)
+    expander._update_pins(6, 0xFFFF, 0x00FF)
+    expander._update_pins(0x0A, 0xFFFF, 0xA050)
+    image = expander.snapshot()
+    assert 22 == len(image) and 0x0F == image[0] and 0x50 == image[20]
+    expander._update_pins(0, 0xFFFF, 0xFFFF)
+    expander._update_pins(6, 0xFFFF, 0)
+    expander.restore(image)
+    assert 0x0F0F == chip_pins(chip, IODIR) and 0x00FF == chip_pins(chip, GPPU)
+    assert 0xA050 & 0xF0F0 == chip.outputs()
+    assert bytes(image) == expander.snapshot()
+
+
+def test_snapshot_transactions(i2c, expander):
+    n = i2c.transactions
+    expander.snapshot()
+    assert (1 if expander.hex_mode else 2) == i2c.transactions - n
+
+
+def test_restore_switches_bank(chip, new_expander):
+    e = new_expander(hex_mode=False)    # BANK = 1
+    image = bytearray(m.POR_IMAGE)
+    image[0] = 0x3C
+    e.restore(image)    # образ с BANK = 0
+    assert not chip.bank and not e._bank and 0x3C == chip.read_reg(IODIR, 0)
+
+
+def test_snapshot_with_seqop_set(chip, expander):
+    expander._update_pins(0, 0xFFFF, 0x1234)
+    ref = expander.snapshot()
+    expander._set_seqop(True)
+    expander.invalidate()
+    image = expander.snapshot()
+    assert ref[:10] == image[:10] and ref[12:] == image[12:]
+    assert chip.iocon & 0x20    # SEQOP восстановлен
+
+
+# чтение GPIO
+def test_iterator_reads_gpio(i2c, chip, expander):
+    chip.drive(0xA55A)
+    n = i2c.transactions
+    values = [next(expander) for _ in range(3)]
+    assert 3 == i2c.transactions - n    # одна транзакция на чтение
+    assert [0x5AA5 if expander.hex_mode else 0x5A] * 3 == values
+    expander.active_port = 1
+    assert (0x5AA5 if expander.hex_mode else 0xA5) == expander.gpio
+
+
+# прерывания
+def test_event_queue(chip, new_expander):
+    e = new_expander(events=4)
+    chip.drive(0xFFFF)
+    e.setup_interrupt(0xFFFF)
+    chip.drive(0xFFFE)
+    e.service_interrupt()
+    assert 1 == e.pending_events
+    assert (0, 0x01, 0xFE) == e.get_event()
+    assert e.get_event() is None
+    for level in 0xFFFF, 0xFFFE, 0xFFFF, 0xFFFE, 0xFFFF:
+        chip.drive(level)
+        e.service_interrupt()
+    assert 3 == e.pending_events and 2 == e.events_lost     # емкость очереди - events - 1
+    e.clear_events()
+    assert 0 == e.pending_events
+
+
+def test_attach_irq(chip, new_expander):
+    e = new_expander()
+    pin = Pin(4, Pin.IN)
+    chip.int_pins[1] = pin
+    chip.drive(0xFFFF)
+    e.setup_interrupt(0x00FF)     # порт B (в формате gpio - младший байт)
+    e.attach_irq(pin, 1)
+    chip.drive(0x7FFF)
+    assert (1, 0x80, 0x7F) == e.get_event()
+    assert 1 == pin.value()     # прерывание сброшено
+
+
+def test_hex_mode_keeps_interrupt_setup(chip, new_expander):
+    """Переключение адресации изменяет только IOCON.BANK"""
+    e = new_expander()
+    e.setup_interrupt(0xFFFF, mirror=True, open_drain=True)
+    assert 0x44 == chip.iocon
+    e.hex_mode = False
+    assert 0xC4 == chip.iocon
+    e.hex_mode = True
+    assert 0x44 == chip.iocon
+
+
+# группа расширителей
+def test_expander_array(i2c):
+    chips = [MCP23017Sim(i2c, 0x20), MCP23017Sim(i2c, 0x21)]
+    arr = m.ExpanderArray(I2cAdapter(i2c), bank=False)
+    assert 2 == len(arr) and 32 == arr.width
+    arr.io_dir = 0
+    arr.gpio = 0x1234ABCD
+    assert 0xABCD == chips[0].outputs() and 0x1234 == chips[1].outputs()
+
+
+# потоковый вывод
+def test_stream_output(i2c, chip, expander):
+    expander._update_pins(0, 0xFFFF, 0)
+    states = [0x0102, 0x0304, 0x0506] if expander.hex_mode else [1, 2, 3]
+    n = i2c.transactions
+    expander.stream_output(expander.pack_states(states))
+    assert 3 == i2c.transactions - n    # IOCON, поток, IOCON
+    assert 0 == chip.iocon & 0x20
+    assert (0x0605 if expander.hex_mode else 0x03) == chip.outputs()
+
+
+def test_stream_output_keeps_seqop(i2c, chip, expander):
+    expander._set_seqop(True)
+    n = i2c.transactions
+    expander.stream_output(b"\x01\x02")
+    assert 1 == i2c.transactions - n and chip.iocon & 0x20
+
+
+def test_stream_output_odd_length(chip, new_expander):
+    e = new_expander()
+    e.io_dir = 0
+    with pytest.raises(ValueError):
+        e.stream_output(b"\x01\x02\x03")
+    e.stream_output(b"\x01\x02\x03\x04", chunk=1)   # chunk - не меньше пары байт
+    assert 0x0403 == chip.outputs()
+    e.set_pins(0x0001)     # OLAT из теневой копии соответствует микросхеме
+    assert 0x0503 == chip.outputs()
+
+
+# потоковый ввод
+def test_sample_into(chip, expander):
+    chip.drive(0xA55A)
+    buf = bytearray(8)
+    count = expander.sample_into(buf)
+    assert 0 == chip.iocon & 0x20
+    if expander.hex_mode:
+        assert 4 == count and bytes(buf) == b"\x5a\xa5" * 4
+    else:
+        assert 8 == count and bytes(buf) == b"\x5a" * 8
+
+
+def test_samples_keeps_seqop(chip, expander):
+    chip.drive(0x1234)
+    expander._set_seqop(True)
+    blocks = [bytes(block) for block in expander.samples(5, chunk=2)]
+    assert 3 == len(blocks) and chip.iocon & 0x20
+    expander._set_seqop(False)
+    list(expander.samples(2))
+    assert 0 == chip.iocon & 0x20
+
+
+# конструктор
+def test_fast_boot_without_transactions(i2c, chip, adapter):
+    e = m.MCP23017(adapter, 0x27, image=m.POR_IMAGE, hex_mode=True)
+    assert 0 == i2c.transactions and e.hex_mode and not chip.bank
+
+
+def test_known_bank_without_probe(i2c, chip, adapter):
+    e = m.MCP23017(adapter, 0x27, bank=False, hex_mode=True)
+    assert not e._bank and 0 == chip.iocon & 0x80
+    assert 0 == i2c.transactions    # IOCON не опрашивается
+
+
+def test_bank_probe(chip, adapter):
+    chip.iocon = 0x80
+    e = m.MCP23017(adapter, 0x27)
+    assert e._bank and not e.hex_mode
+
+
+def test_invalid_address(adapter):
+    with pytest.raises(ValueError):
+        m.MCP23017(adapter, 0x30, image=m.POR_IMAGE)
+
+
+def test_import_without_machine():
+    """Импорт драйвера не загружает модуль machine (классы шин нужны только приложению)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys; sys.path[:0] = ['host', '.']; import mcp23017mod; print('machine' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert "False" == out.stdout.strip()
+
+
+# профили выводов
+PROFILE = m.PinProfile({0: m.PIN_IN | m.PIN_PULL_UP | m.PIN_IRQ, 1: m.PIN_IN | m.PIN_INVERT | m.PIN_IRQ_LOW,
+                        8: m.PIN_OUT | m.PIN_HIGH, 9: m.PIN_OUT})
+
+
+def test_profile_conflict():
+    with pytest.raises(ValueError):
+        m.PinProfile({0: m.PIN_HIGH | m.PIN_LOW})
+
+
+def test_apply_profile(i2c, chip, expander):
+    assert expander.apply_profile(PROFILE) > 0
+    for index in 0, 1, 2, 3, 4, 6:
+        assert PROFILE.get(index) == chip_pins(chip, index)
+    assert 0x100 == chip_pins(chip, OLAT) & 0x300
+    n = i2c.transactions
+    assert 0 == expander.apply_profile(PROFILE)     # diff: все значения уже в микросхеме
+    assert n == i2c.transactions
+    assert expander.apply_profile(PROFILE, diff=False) > 0
+
+
+def test_apply_profile_keeps_seqop(chip, expander):
+    expander._set_seqop(True)
+    expander.apply_profile(PROFILE)
+    assert PROFILE.get(6) == chip_pins(chip, GPPU)
+    assert chip.iocon & 0x20
+
+
+# обработчики событий
+def test_event_and_pin_handlers(chip, new_expander):
+    e = new_expander()
+    chip.drive(0xFFFF)
+    events, pins = list(), list()
+    e.add_event_handler(lambda port, mask, cap: events.append((port, mask, cap)))
+    e.set_pin_irq(9, lambda arg: pins.append(arg), 1, "b1")    # только спад
+    chip.drive(0xFDFF)
+    e.service_interrupt()
+    chip.drive(0xFFFF)
+    e.service_interrupt()
+    assert [(1, 0x02, 0xFD), (1, 0x02, 0xFF)] == events and ["b1"] == pins
+    handler = e._ev_handlers[0]
+    e.remove_event_handler(handler)
+    e.set_pin_irq(9)
+    assert e._ev_handlers is None and 0 == chip_pins(chip, 2)   # GPINTEN
+
+
+# итератор изменений
+def test_changes_yields_only_changes(chip, new_expander, monkeypatch):
+    e = new_expander()
+    chip.drive(0xFFFF)
+    # уровни выводов модели (порт A - младший байт) перед каждым опросом
+    levels = iter((0xFFFF, 0xFFFE, 0xFFFE, 0xFEFE, 0xFEFC))
+    sleeps = list()
+
+    def sleep(ms):
+        sleeps.append(ms)
+        chip.drive(next(levels))
+    monkeypatch.setattr(m.time, "sleep_ms", sleep)
+    gen = e.changes(watch_mask=0xFF00, min_ms=5, max_ms=40, idle_polls=1)   # только порт A
+    assert (0xFEFF, 0x0100) == next(gen)
+    assert (0xFCFE, 0x0200) == next(gen)    # изменение порта B не возвращается
+    assert [5, 10, 5, 10, 20] == sleeps
+
+
+def test_changes_backoff(chip, new_expander, monkeypatch):
+    e = new_expander()
+    sleeps = list()
+
+    def sleep(ms):
+        sleeps.append(ms)
+        if 8 == len(sleeps):
+            chip.drive(0xFFFE)
+    monkeypatch.setattr(m.time, "sleep_ms", sleep)
+    chip.drive(0xFFFF)
+    value, changed = next(e.changes(min_ms=5, max_ms=40, idle_polls=2))
+    assert 0x0100 == changed
+    assert [5, 5, 10, 20, 40, 40, 40, 40] == sleeps
@@ -0,0 +1,67 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Выводы расширителя с интерфейсом machine.Pin (mcp23017pin.ExpanderPin) на модели микросхемы.
+ExpanderPin checks against the register model."""
+from mcp23017sim import GPPU
+from mcp23017pin import ExpanderPin
+
+
+def test_expander_pin(i2c, chip, new_expander):
+    e = new_expander()
+    out = ExpanderPin(e, 9, ExpanderPin.OUT, value=1)
+    inp = ExpanderPin(e, 2, ExpanderPin.IN, ExpanderPin.PULL_UP)
+    assert 0x0200 == chip.outputs()
+    assert 0x04 == chip.regs[0][GPPU]
+    i2c.reset_counters()
+    assert 1 == out.value() and ExpanderPin.OUT == out.mode()
+    assert 0 == i2c.transactions    # уровень выхода из теневой копии
+    chip.drive(0x0000)
+    assert 0 == inp.value()
+    chip.drive(0x0004)
+    assert 1 == inp()
+    out.off()
+    assert 0 == chip.outputs()
+
+
+def test_hold_commit(i2c, chip, new_expander):
+    e = new_expander()
+    pins = [ExpanderPin(e, n, ExpanderPin.OUT, value=0) for n in range(16)]
+    i2c.reset_counters()
+    e.hold()
+    for pin in pins[9::2]:
+        pin.on()
+    assert 0 == i2c.transactions
+    e.commit()
+    assert 1 == i2c.transactions
+    assert 0xAA00 == chip.outputs()
+
+
+def test_hold_commit_bank1(i2c, chip, new_expander):
+    e = new_expander(hex_mode=False)
+    pins = [ExpanderPin(e, n, ExpanderPin.OUT, value=0) for n in (0, 8)]
+    i2c.reset_counters()
+    e.hold()
+    e.hold()
+    for pin in pins:
+        pin.on()
+    e.commit()
+    assert 0 == i2c.transactions    # вложенный hold
+    e.commit()
+    assert 2 == i2c.transactions    # по транзакции на порт
+    assert 0x0101 == chip.outputs()
+
+
+def test_irq(chip, new_expander):
+    e = new_expander()
+    chip.drive(0xFFFF)
+    pin = ExpanderPin(e, 3, ExpanderPin.IN)
+    calls = list()
+    pin.irq(calls.append, ExpanderPin.IRQ_FALLING)
+    chip.drive(0xFFF7)
+    e.service_interrupt()
+    chip.drive(0xFFFF)
+    e.service_interrupt()   # фронт не выбран
+    assert [pin] == calls
+    pin.irq(None)
+    assert 0 == chip.regs[0][2]     # GPINTENA
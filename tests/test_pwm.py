@@ -0,0 +1,76 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Программная ШИМ pwmmod.SoftPWM на модели микросхемы.
+SoftPWM checks against the register model."""
+from mcp23017sim import MCP23017Sim
+from sensor_pack.bus_service import I2cAdapter
+from pwmmod import SoftPWM
+import mcp23017mod
+from conftest import ADDRESS
+
+
+class RecorderSim(MCP23017Sim):
+    """Запоминает уровни выходов после записи каждого байта"""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.history = list()
+
+    def write_byte(self, addr: int, value: int):
+        super().write_byte(addr, value)
+        self.history.append(self.outputs())
+
+
+def test_waveform(i2c):
+    chip = RecorderSim(i2c, ADDRESS)
+    e = mcp23017mod.MCP23017(I2cAdapter(i2c), ADDRESS, image=mcp23017mod.POR_IMAGE, hex_mode=False)
+    pwm = SoftPWM(e, 0x0F, period_ms=2, exclusive=True)
+    duty = 0, 16384, 32768, 65535
+    for pin, value in enumerate(duty):
+        pwm.duty_u16(pin, value)
+    pwm.start()
+    chip.history.clear()
+    i2c.reset_counters()
+    pwm._timer.fire()
+    assert 1 == i2c.transactions
+    on = [sum((state >> pin) & 1 for state in chip.history) for pin in range(4)]
+    assert 0 == on[0]
+    for pin in 1, 2:
+        assert abs(on[pin] - pwm.steps * duty[pin] / 65536) <= 1
+    assert 0x08 == chip.outputs()   # до конца периода включен только канал 100%
+    pwm.stop()
+
+
+def test_keeps_other_outputs(chip, new_expander):
+    e = new_expander()
+    e._update_pins(0, 0x10, 0)
+    pwm = SoftPWM(e, 0x03)
+    pwm.duty_u16(0, 30000)
+    pwm.tick()
+    e._update_pins(0x0A, 0x10, 0x10)
+    pwm.tick()
+    assert 0x10 == chip.outputs() & 0x10
+
+
+def test_busy_bound(i2c):
+    """Каналы с заполнением больше 50% выравниваются по концу периода: шина занята не больше половины периода и одного интервала"""
+    chip = RecorderSim(i2c, ADDRESS)
+    e = mcp23017mod.MCP23017(I2cAdapter(i2c), ADDRESS, image=mcp23017mod.POR_IMAGE, hex_mode=False)
+    pwm = SoftPWM(e, 0x07, period_ms=2, exclusive=True)
+    duty = 32768, 49152, 62000
+    for pin, value in enumerate(duty):
+        pwm.duty_u16(pin, value)
+    assert 0 < pwm.busy() <= 0.5 + 1 / pwm.steps
+    pwm.start()
+    chip.history.clear()
+    pwm._timer.fire()
+    held = pwm.steps - (len(chip.history) - 1)     # последнее состояние сохраняется до конца периода
+    assert len(chip.history) <= pwm.steps // 2 + 1
+    for pin in range(3):
+        on = sum((state >> pin) & 1 for state in chip.history[:-1]) + held * ((chip.history[-1] >> pin) & 1)
+        assert abs(on - pwm.steps * duty[pin] / 65536) <= 1
+    pwm.stop()
+    pwm.duty_u16(0, 0)
+    pwm.duty_u16(1, 65535)
+    pwm.duty_u16(2, 0)
+    assert 0 == pwm.busy()
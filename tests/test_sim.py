@@ -0,0 +1,76 @@
+# CPython
+# MIT license
+# Copyright (c) 2023 Roman Shevchik   goctaprog@gmail.com
+"""Модель MCP23017 (host/mcp23017sim.py): адресация, IOCON, прерывания.
+MCP23017 register model checks."""
+from machine import Pin
+from mcp23017sim import IODIR, GPPU, INTF, OLAT
+
+
+def test_por_state(chip):
+    assert 0xFF == chip.regs[0][IODIR] == chip.regs[1][IODIR]
+    assert 0 == chip.iocon and not chip.bank
+
+
+def test_bank0_sequential_write(i2c, chip):
+    i2c.writeto_mem(0x27, 0x00, bytes([0x12, 0x34, 0x56]))     # IODIRA, IODIRB, IPOLA
+    assert (0x12, 0x34, 0x56) == (chip.regs[0][IODIR], chip.regs[1][IODIR], chip.regs[0][1])
+
+
+def test_iocon_mirror_and_bit0(i2c, chip):
+    i2c.writeto_mem(0x27, 0x0B, b"\x45")    # IOCON по второму адресу, бит 0 не записывается
+    assert 0x44 == chip.iocon == i2c.readfrom_mem(0x27, 0x0A, 1)[0]
+    i2c.writeto_mem(0x27, 0x0A, b"\x80")    # BANK = 1
+    assert chip.bank
+    assert 0x80 == i2c.readfrom_mem(0x27, 0x05, 1)[0] == i2c.readfrom_mem(0x27, 0x15, 1)[0]
+
+
+def test_bank1_addressing(i2c, chip):
+    chip.iocon = 0x80
+    i2c.writeto_mem(0x27, 0x16, b"\xa5")    # GPPUB
+    assert 0xA5 == chip.regs[1][GPPU]
+
+
+def test_seqop_pointer(i2c, chip):
+    chip.iocon = 0x20   # BANK = 0, SEQOP = 1: указатель переключается в паре A/B
+    i2c.writeto_mem(0x27, 0x14, bytes([1, 2, 3, 4]))   # OLATA, OLATB, OLATA, OLATB
+    assert (3, 4) == (chip.regs[0][OLAT], chip.regs[1][OLAT])
+    chip.iocon = 0xA0   # BANK = 1, SEQOP = 1: указатель не изменяется
+    i2c.writeto_mem(0x27, 0x0A, bytes([5, 6, 7]))
+    assert 7 == chip.regs[0][OLAT] and 4 == chip.regs[1][OLAT]
+
+
+def test_gpio_write_sets_olat(i2c, chip):
+    i2c.writeto_mem(0x27, 0x00, b"\x00")
+    i2c.writeto_mem(0x27, 0x12, b"\x3c")    # GPIOA
+    assert 0x3C == chip.regs[0][OLAT] == chip.outputs()
+
+
+def test_intf_intcap_latch(i2c, chip):
+    chip.regs[0][2] = 0x03      # GPINTENA
+    chip.drive(0xFFFF)
+    i2c.readfrom_mem(0x27, 0x10, 1)     # сброс
+    chip.drive(0xFFFE)
+    chip.drive(0xFFFC)      # второе изменение до чтения INTCAP не изменяет захваченные значения
+    assert 0x01 == chip.regs[0][INTF]
+    assert 0xFE == i2c.readfrom_mem(0x27, 0x10, 1)[0]   # INTCAPA
+    assert 0 == chip.regs[0][INTF]
+
+
+def test_int_output(chip):
+    pin = Pin(3, Pin.IN)
+    chip.int_pins[0] = pin
+    chip.regs[0][2] = 0x01
+    chip.drive(0xFFFF)
+    chip.read_byte(0x10)
+    assert 1 == pin.value()     # ODR = 0, INTPOL = 0: активный уровень низкий
+    chip.drive(0xFFFE)
+    assert 0 == pin.value()
+    chip.read_byte(0x12)    # чтение GPIO сбрасывает прерывание
+    assert 1 == pin.value()
+
+
+def test_bus_counters(i2c, chip):
+    i2c.reset_counters()
+    i2c.readfrom_mem(0x27, 0x00, 2)
+    assert 1 == i2c.transactions and i2c.bus_time_us > 0